@@ -0,0 +1,53 @@
+"""
+Shared fixtures for the offline unit tests. Every test gets its own price
+and geocode cache files and fresh in-memory state, so nothing is read from
+or written to the real data directory.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import local modules
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import tools.commodity_price_tool as cpt
+import tools.geo_utils as geo_utils
+
+
+class FakeClock:
+    """Stands in for the time module so tests control the current time."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cpt, "time", fake)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch, tmp_path):
+    """Give every test its own cache files and fresh in-memory state."""
+    monkeypatch.setattr(cpt, "PRICE_CACHE_FILE", tmp_path / "price_cache.db")
+    monkeypatch.setattr(cpt, "_market_stats", None)
+    monkeypatch.setattr(cpt, "_circuit", {"failures": 0, "open_until": 0.0})
+    monkeypatch.setattr(geo_utils, "GEOCODE_CACHE_FILE", tmp_path / "geocode_cache.db")
+    cpt._price_memory.clear()
+    yield
+    cpt._price_memory.clear()
@@ -0,0 +1,698 @@
+"""
+Unit tests for the commodity price tool's scraping and lookup logic.
+These run offline against stubbed scrapers; nothing here contacts Agmarknet.
+"""
+
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pytest
+import requests
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+import tools.commodity_price_tool as cpt
+
+
+def test_circuit_opens_after_threshold_failures(clock):
+    for _ in range(cpt.CIRCUIT_FAILURE_THRESHOLD - 1):
+        cpt._circuit_record(False)
+        cpt._circuit_check()
+
+    cpt._circuit_record(False)
+    with pytest.raises(cpt.AgmarknetUnavailable):
+        cpt._circuit_check()
+
+    clock.now += cpt.CIRCUIT_COOLDOWN + 1
+    cpt._circuit_check()
+
+
+def test_circuit_success_resets_failures(clock):
+    for _ in range(cpt.CIRCUIT_FAILURE_THRESHOLD - 1):
+        cpt._circuit_record(False)
+    cpt._circuit_record(True)
+    assert cpt._circuit["failures"] == 0
+
+    cpt._circuit_record(False)
+    cpt._circuit_check()
+
+
+class FakeElement:
+    """A dropdown with the given option texts."""
+
+    def __init__(self, options):
+        self.options = options
+
+
+class FakeSelect:
+    """Stands in for selenium's Select over a FakeElement."""
+
+    def __init__(self, element):
+        self.element = element
+
+    def select_by_visible_text(self, text):
+        if text not in self.element.options:
+            raise NoSuchElementException(f"Could not locate element with visible text: {text}")
+
+
+class FakeWait:
+    """WebDriverWait that succeeds at once."""
+
+    def __init__(self, driver, timeout, **kwargs):
+        pass
+
+    def until(self, condition):
+        return True
+
+
+class FakeDriver:
+    """Just enough of a WebDriver to walk the dropdowns of the search form."""
+
+    def __init__(self, dropdowns):
+        self.dropdowns = dropdowns
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, element_id):
+        return FakeElement(self.dropdowns[element_id])
+
+    def execute_script(self, script, element=None, *args):
+        return element.options if element is not None else None
+
+
+DROPDOWNS = {
+    "ddlArrivalPrice": ["Price", "Arrival", "Both"],
+    "ddlCommodity": ["--Select--", "Wheat", "Rice"],
+    "ddlState": ["--Select--", "Punjab"],
+    "ddlDistrict": ["--Select--", "Mohali"],
+    "ddlMarket": ["--Select--", "Kharar"],
+}
+
+
+@pytest.fixture
+def fake_browser(monkeypatch):
+    monkeypatch.setattr(cpt, "Select", FakeSelect)
+    monkeypatch.setattr(cpt, "WebDriverWait", FakeWait)
+    monkeypatch.setattr(cpt, "_wait_options", lambda driver, dropdown_id, **kwargs: driver.find_element(None, dropdown_id))
+    return FakeDriver(dict(DROPDOWNS))
+
+
+def _scrape_selenium(driver, commodity="Wheat"):
+    return cpt._scrape_commodity_selenium(
+        driver, "Punjab", "Mohali", "Kharar", commodity, "Both", "01-Jan-2024", "14-Jan-2024"
+    )
+
+
+def test_selenium_missing_option_is_value_error(fake_browser):
+    with pytest.raises(ValueError, match="Commodity 'Onion' not found"):
+        _scrape_selenium(fake_browser, commodity="Onion")
+
+
+def test_selenium_timeouts_are_not_value_errors(fake_browser, monkeypatch):
+    def time_out(driver, dropdown_id, **kwargs):
+        raise TimeoutException(f"{dropdown_id} never filled in")
+
+    monkeypatch.setattr(cpt, "_wait_options", time_out)
+    with pytest.raises(TimeoutException):
+        _scrape_selenium(fake_browser)
+
+
+def _browser_batch(monkeypatch, error):
+    """Run a batch where HTTP fails and the browser raises error."""
+    def http(*args, **kwargs):
+        raise RuntimeError("form changed")
+
+    def selenium(*args, **kwargs):
+        raise error
+
+    class Driver:
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_scrape_commodity_selenium", selenium)
+    monkeypatch.setattr(cpt, "_open_driver", lambda debug: Driver())
+    return list(cpt.scrape_commodity_batch("Punjab", "Mohali", "Kharar", ["Wheat"]))
+
+
+def test_browser_timeouts_count_as_circuit_failures(monkeypatch):
+    cpt._circuit["failures"] = 2
+    _browser_batch(monkeypatch, TimeoutException("page load"))
+    assert cpt._circuit["failures"] == 3
+
+
+def test_missing_options_count_as_answers(monkeypatch):
+    cpt._circuit["failures"] = 2
+    [(_, records, error)] = _browser_batch(monkeypatch, ValueError("Commodity 'Wheat' not found in dropdown."))
+    assert records == [] and isinstance(error, ValueError)
+    assert cpt._circuit["failures"] == 0
+
+
+@pytest.fixture
+def punjab_lookup(monkeypatch):
+    """Lookups from a point in Mohali district, with two local markets."""
+    monkeypatch.setattr(
+        cpt, "find_nearest_location",
+        lambda lat, lon: {"state": "Punjab", "district": "Mohali", "distance": 1.0}
+    )
+    monkeypatch.setattr(cpt, "get_markets_in_district", lambda state, district: ["Kharar", "Mohali"])
+
+
+def _site_down(monkeypatch):
+    """Agmarknet refuses connections and Chrome can't start."""
+    def http(*args, **kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    def open_driver(debug):
+        raise RuntimeError("chromedriver not found")
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_open_driver", open_driver)
+
+
+def test_scrape_reports_http_outage_when_browser_fails(monkeypatch):
+    _site_down(monkeypatch)
+    with pytest.raises(requests.ConnectionError):
+        cpt.scrape_commodity("Punjab", "Mohali", "Kharar", "Onion")
+
+
+def test_batch_reports_http_outage_when_browser_fails(monkeypatch):
+    _site_down(monkeypatch)
+    [(_, records, error)] = cpt.scrape_commodity_batch("Punjab", "Mohali", "Kharar", ["Onion"])
+    assert records == [] and isinstance(error, requests.ConnectionError)
+
+
+def test_lookup_reports_outage_instead_of_missing_data(monkeypatch, punjab_lookup):
+    _site_down(monkeypatch)
+    result = cpt._lookup_commodity_prices(30.7, 76.7, ["Onion"])["Onion"]
+    assert result["market"] is None
+    assert result["error"].startswith("Agmarknet is unavailable")
+
+
+def test_single_and_batch_browser_scrapes_do_not_deadlock(monkeypatch):
+    # One key stripe and one browser make any lock order mismatch deadlock
+    monkeypatch.setattr(cpt, "_PRICE_KEY_LOCKS", [threading.Lock()])
+    monkeypatch.setattr(cpt, "_BROWSER_SEM", threading.Semaphore(1))
+
+    def http(*args, **kwargs):
+        time.sleep(0.001)
+        raise RuntimeError("form changed")
+
+    def selenium(driver, state, district, market, commodity, *args):
+        time.sleep(0.001)
+        return [{"Commodity": commodity}]
+
+    class Driver:
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_scrape_commodity_selenium", selenium)
+    monkeypatch.setattr(cpt, "_open_driver", lambda debug: Driver())
+
+    def single(i):
+        cpt.scrape_commodity("Punjab", "Mohali", "Kharar", f"Single{i}", force_fresh=True)
+
+    def batch(i):
+        list(cpt.scrape_commodity_batch(
+            "Punjab", "Mohali", "Kharar", [f"Batch{i}-{n}" for n in range(5)], force_fresh=True
+        ))
+
+    threads = [
+        threading.Thread(target=target, args=(i,), daemon=True)
+        for i in range(8) for target in (single, batch)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_market_score_orders_markets_by_history():
+    for _ in range(3):
+        cpt._record_market_result("Punjab", "Mohali", "Good", "Wheat", 10)
+        cpt._record_market_result("Punjab", "Mohali", "Small", "Wheat", 2)
+        cpt._record_market_result("Punjab", "Mohali", "Empty", "Wheat", 0)
+
+    markets = ["Empty", "Unseen", "Small", "Good"]
+    ranked = sorted(
+        markets,
+        key=lambda market: cpt._market_score("Punjab", "Mohali", market, ["Wheat"]),
+        reverse=True
+    )
+    assert ranked == ["Good", "Small", "Unseen", "Empty"]
+    assert cpt._market_score("Punjab", "Mohali", "Unseen", ["Wheat"]) == (0.5, 0.0)
+
+
+def test_market_stats_persist_across_reloads(monkeypatch):
+    cpt._record_market_result("Punjab", "Mohali", "Kharar", "Rice", 4)
+    monkeypatch.setattr(cpt, "_market_stats", None)
+    assert cpt._load_market_stats()[("Punjab", "Mohali", "Kharar", "Rice")] == [1, 1, 4]
+
+
+def test_market_stats_count_only_fresh_scrapes(monkeypatch):
+    outcomes = {"Rice": [{"Modal Price": "2000"}], "Wheat": RuntimeError("form changed")}
+
+    def http(state, district, market, commodity, *args, **kwargs):
+        outcome = outcomes[commodity]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def open_driver(debug):
+        raise RuntimeError("chromedriver not found")
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_open_driver", open_driver)
+    for _ in range(2):
+        list(cpt.scrape_commodity_batch("Punjab", "Mohali", "Kharar", ["Rice", "Wheat"]))
+
+    # The second batch is served from the cache, and Wheat always failed
+    assert cpt._load_market_stats() == {("Punjab", "Mohali", "Kharar", "Rice"): [1, 1, 1]}
+
+
+def test_lookup_prefers_district_markets_over_better_scored_alternates(monkeypatch):
+    monkeypatch.setattr(
+        cpt, "find_nearest_location",
+        lambda lat, lon: {"state": "Punjab", "district": "Amritsar", "distance": 1.0}
+    )
+    monkeypatch.setattr(cpt, "get_markets_in_district", lambda state, district: ["Ajnala"])
+    for _ in range(3):
+        cpt._record_market_result("Punjab", "Ludhiana", "Ludhiana", "Rice", 5)
+
+    def http(state, district, market, commodity, *args, **kwargs):
+        return [{"Market Name": market, "Modal Price": "2000", "Price Date": "05 Jan 2024"}]
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    result = cpt._lookup_commodity_prices(31.6, 74.9, ["Rice"])["Rice"]
+    assert (result["district"], result["market"]) == ("Amritsar", "Ajnala")
+
+
+def _freeze_today(monkeypatch, today):
+    class FrozenDate(date):
+        @classmethod
+        def today(cls):
+            return today
+
+    monkeypatch.setattr(cpt, "date", FrozenDate)
+    monkeypatch.setattr(cpt, "_DEFAULT_DATE_CACHE", {})
+
+
+def test_default_date_range_crosses_year_boundary(monkeypatch):
+    _freeze_today(monkeypatch, date(2024, 1, 5))
+    assert cpt._default_date_range() == ("22-Dec-2023", "05-Jan-2024")
+
+
+def test_default_date_range_fallback_year_crosses_year_boundary(monkeypatch):
+    _freeze_today(monkeypatch, date(2026, 1, 5))
+    assert cpt._default_date_range() == ("22-Dec-2022", "05-Jan-2023")
+
+
+def test_default_date_range_leap_day(monkeypatch):
+    _freeze_today(monkeypatch, date(2028, 2, 29))
+    assert cpt._default_date_range() == ("14-Feb-2023", "28-Feb-2023")
+
+
+def test_default_date_range_is_recomputed_the_next_day(monkeypatch):
+    _freeze_today(monkeypatch, date(2024, 3, 1))
+    assert cpt._default_date_range()[1] == "01-Mar-2024"
+    cached = cpt._DEFAULT_DATE_CACHE
+    _freeze_today(monkeypatch, date(2024, 3, 2))
+    monkeypatch.setattr(cpt, "_DEFAULT_DATE_CACHE", cached)
+    assert cpt._default_date_range()[1] == "02-Mar-2024"
+
+
+RESULTS_HTML = """
+<html><body>
+<table id="cphBody_GridPriceData">
+  <tr><th>Sl no.</th><th>District Name</th><th>Market Name</th><th>Variety</th>
+      <th>Min Price (Rs./Quintal)</th><th>Max Price (Rs./Quintal)</th>
+      <th>Modal Price (Rs./Quintal)</th><th>Price Date</th></tr>
+  <tr><td>1</td><td>Mohali</td><td>Kharar</td><td>Dara</td>
+      <td>2100</td><td>2300</td><td>2200</td><td>05 Jan 2024</td></tr>
+  <tr style="background-color:#F9F9F9;"><td colspan="8">Summary</td></tr>
+  <tr><td>2</td><td> Mohali </td><td>Kharar</td><td>Other</td>
+      <td>2000</td><td>2150</td><td>2075</td><td>04 Jan 2024</td></tr>
+  <tr><td><span style="background-color:#F9F9F9">Total</span></td><td>-</td></tr>
+</table>
+</body></html>
+"""
+
+
+@pytest.mark.skipif(not cpt.HAS_LXML, reason="lxml is not installed")
+def test_lxml_parser_matches_beautifulsoup_parser():
+    from lxml import html as lxml_html
+
+    soup_table = BeautifulSoup(RESULTS_HTML, "html.parser").find("table")
+    lxml_table = lxml_html.fromstring(RESULTS_HTML).xpath("//table")[0]
+
+    expected = cpt._parse_results_table(soup_table)
+    assert len(expected) == 2
+    assert expected[0]["Modal Price"] == "2200"
+    assert cpt._parse_results_table_lxml(lxml_table) == expected
+
+
+def test_parse_results_page_finds_the_results_table():
+    records = cpt._parse_results_page(RESULTS_HTML)
+    assert [record["Variety"] for record in records] == ["Dara", "Other"]
+    assert cpt._parse_results_page("<html><body><p>No data</p></body></html>") is None
+
+
+def test_parse_results_page_without_lxml(monkeypatch):
+    monkeypatch.setattr(cpt, "HAS_LXML", False)
+    records = cpt._parse_results_page(RESULTS_HTML)
+    assert [record["Variety"] for record in records] == ["Dara", "Other"]
+
+
+@pytest.mark.parametrize("wanted, expected", [
+    ("Kharar", "Kharar"),
+    ("kharar", "Kharar"),
+    ("MOHALI", "Mohali"),
+    ("Kurali", "Kurali(Mohali)"),
+    ("Unknown", "Dera Bassi"),
+])
+def test_closest_option(wanted, expected):
+    options = ["Dera Bassi", "Kharar", "Mohali", "Kurali(Mohali)"]
+    assert cpt._closest_option(options, wanted) == expected
+
+
+def test_closest_option_prefers_first_spelling_ignoring_case():
+    assert cpt._closest_option(["Ropar", "ROPAR"], "ropar") == "Ropar"
+    assert cpt._closest_option(["Ropar", "ROPAR"], "ROPAR") == "ROPAR"
+
+
+def _search_page(districts=(), markets=()):
+    """The Agmarknet search form with the given district and market options."""
+    def select(name, options):
+        rendered = "".join(f'<option value="{value}">{text}</option>' for value, text in options)
+        return f'<select name="ctl00$cphBody${name}" id="{name}">{rendered}</select>'
+
+    return f"""
+    <html><body><form>
+      <input type="hidden" name="__VIEWSTATE" value="state" />
+      {select("ddlArrivalPrice", [("0", "Price"), ("1", "Arrival"), ("2", "Both")])}
+      {select("ddlCommodity", [("0", "--Select--"), ("1", "Wheat"), ("23", "Onion")])}
+      {select("ddlState", [("0", "--Select--"), ("PB", "Punjab")])}
+      {select("ddlDistrict", [("0", "--Select--"), *districts])}
+      {select("ddlMarket", [("0", "--Select--"), *markets])}
+      <input type="text" name="ctl00$cphBody$txtDate" id="txtDate" value="" />
+      <input type="text" name="ctl00$cphBody$txtDateTo" id="txtDateTo" value="" />
+      <input type="submit" name="ctl00$cphBody$btnGo" id="btnGo" value="Go" />
+    </form></body></html>
+    """
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Serves the search form's postbacks the way Agmarknet does."""
+
+    def __init__(self):
+        self.posts = []
+
+    def get(self, url, timeout=None):
+        return FakeResponse(_search_page())
+
+    def post(self, url, data=None, timeout=None):
+        self.posts.append(dict(data))
+        target = data["__EVENTTARGET"]
+        if target.endswith("ddlState"):
+            return FakeResponse(_search_page(districts=[("12", "Mohali"), ("13", "Ludhiana")]))
+        if target.endswith("ddlDistrict"):
+            return FakeResponse(_search_page(
+                districts=[("12", "Mohali"), ("13", "Ludhiana")],
+                markets=[("7", "Kharar"), ("8", "Kurali(Mohali)")]
+            ))
+        return FakeResponse(RESULTS_HTML)
+
+
+def test_http_scrape_replays_the_search_form(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(cpt, "_new_session", lambda: session)
+
+    records = cpt._scrape_commodity_http(
+        "Punjab", "mohali", "Kurali", "Wheat", "Both", "01-Jan-2024", "14-Jan-2024"
+    )
+    assert [record["Variety"] for record in records] == ["Dara", "Other"]
+
+    go = session.posts[-1]
+    assert go["__EVENTTARGET"] == ""
+    assert go["__VIEWSTATE"] == "state"
+    assert go["ctl00$cphBody$ddlArrivalPrice"] == "2"
+    assert go["ctl00$cphBody$ddlCommodity"] == "1"
+    assert go["ctl00$cphBody$ddlState"] == "PB"
+    assert go["ctl00$cphBody$ddlDistrict"] == "12"
+    assert go["ctl00$cphBody$ddlMarket"] == "8"
+    assert go["ctl00$cphBody$txtDate"] == "01-Jan-2024"
+    assert go["ctl00$cphBody$txtDateTo"] == "14-Jan-2024"
+    assert go["ctl00$cphBody$btnGo"] == "Go"
+
+
+def test_http_scrape_rejects_unknown_commodity(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(cpt, "_new_session", lambda: session)
+
+    with pytest.raises(ValueError, match="Commodity 'Saffron' not found"):
+        cpt._scrape_commodity_http(
+            "Punjab", "Mohali", "Kharar", "Saffron", "Both", "01-Jan-2024", "14-Jan-2024"
+        )
+    assert session.posts == []
+
+
+def test_http_scrape_without_results_table(monkeypatch):
+    session = FakeSession()
+    session_post = session.post
+
+    def post(url, data=None, timeout=None):
+        response = session_post(url, data=data, timeout=timeout)
+        if not data["__EVENTTARGET"]:
+            response.text = "<html><body>No Data Found</body></html>"
+        return response
+
+    session.post = post
+    monkeypatch.setattr(cpt, "_new_session", lambda: session)
+    with pytest.raises(RuntimeError, match="No data table"):
+        cpt._scrape_commodity_http(
+            "Punjab", "Mohali", "Kharar", "Wheat", "Both", "01-Jan-2024", "14-Jan-2024"
+        )
+
+
+class CountingDriver:
+    """Records how often Chrome is started and stopped."""
+
+    def __init__(self, log):
+        self.log = log
+        log.append("open")
+
+    def quit(self):
+        self.log.append("quit")
+
+
+def test_batch_serves_cache_then_http_then_one_browser(monkeypatch):
+    log = []
+
+    def http(state, district, market, commodity, *args, **kwargs):
+        if commodity == "Onion":
+            raise RuntimeError("form changed")
+        if commodity == "Saffron":
+            raise ValueError("Commodity 'Saffron' not found in dropdown.")
+        return [{"Commodity": commodity, "via": "http"}]
+
+    def selenium(driver, state, district, market, commodity, *args):
+        return [{"Commodity": commodity, "via": "browser"}]
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_scrape_commodity_selenium", selenium)
+    monkeypatch.setattr(cpt, "_open_driver", lambda debug: CountingDriver(log))
+    monkeypatch.setattr(cpt, "_resolve_dates", lambda date_from, date_to: ("01-Jan-2024", "14-Jan-2024"))
+
+    rice_key = cpt._price_cache_key("Punjab", "Mohali", "Kharar", "Rice", "Both", "01-Jan-2024", "14-Jan-2024")
+    cpt._price_cache_put(rice_key, [{"Commodity": "Rice", "via": "cache"}])
+
+    results = list(cpt.scrape_commodity_batch(
+        "Punjab", "Mohali", "Kharar", ["Rice", "Wheat", "Onion", "Saffron", "Potato"]
+    ))
+    assert results[0] == ("Rice", [{"Commodity": "Rice", "via": "cache"}], None)
+
+    by_commodity = {commodity: (records, error) for commodity, records, error in results}
+    assert by_commodity["Wheat"] == ([{"Commodity": "Wheat", "via": "http"}], None)
+    assert by_commodity["Potato"] == ([{"Commodity": "Potato", "via": "http"}], None)
+    assert by_commodity["Onion"] == ([{"Commodity": "Onion", "via": "browser"}], None)
+    assert by_commodity["Saffron"][0] == [] and isinstance(by_commodity["Saffron"][1], ValueError)
+    # Commodities that need the browser come last and share one Chrome
+    assert results[-1][0] == "Onion"
+    assert log == ["open", "quit"]
+
+
+def test_batch_shares_one_browser_between_commodities(monkeypatch):
+    log = []
+
+    def http(*args, **kwargs):
+        raise RuntimeError("form changed")
+
+    def selenium(driver, state, district, market, commodity, *args):
+        return [{"Commodity": commodity}]
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_scrape_commodity_selenium", selenium)
+    monkeypatch.setattr(cpt, "_open_driver", lambda debug: CountingDriver(log))
+
+    results = list(cpt.scrape_commodity_batch("Punjab", "Mohali", "Kharar", ["Rice", "Wheat", "Onion"]))
+    assert sorted(commodity for commodity, _, _ in results) == ["Onion", "Rice", "Wheat"]
+    assert log == ["open", "quit"]
+    assert cpt._BROWSER_SEM.acquire(blocking=False)
+    cpt._BROWSER_SEM.release()
+
+
+def test_batch_serves_stale_copy_when_scrape_fails(monkeypatch, clock):
+    def http(*args, **kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    def open_driver(debug):
+        raise RuntimeError("chromedriver not found")
+
+    monkeypatch.setattr(cpt, "_resolve_dates", lambda date_from, date_to: ("01-Jan-2024", "14-Jan-2024"))
+    key = cpt._price_cache_key("Punjab", "Mohali", "Kharar", "Rice", "Both", "01-Jan-2024", "14-Jan-2024")
+    cpt._price_cache_put(key, [{"Commodity": "Rice"}])
+    clock.now += cpt.PRICE_CACHE_MAX_AGE + 1
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_open_driver", open_driver)
+    assert list(cpt.scrape_commodity_batch("Punjab", "Mohali", "Kharar", ["Rice"])) == [
+        ("Rice", [{"Commodity": "Rice"}], None)
+    ]
+
+
+
+def test_batch_skips_commodities_once_stopped(monkeypatch):
+    log = []
+    stop = threading.Event()
+
+    def http(*args, **kwargs):
+        raise RuntimeError("form changed")
+
+    def selenium(driver, state, district, market, commodity, *args):
+        stop.set()
+        return [{"Commodity": commodity}]
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_scrape_commodity_selenium", selenium)
+    monkeypatch.setattr(cpt, "_open_driver", lambda debug: CountingDriver(log))
+
+    results = list(cpt.scrape_commodity_batch(
+        "Punjab", "Mohali", "Kharar", ["Rice", "Wheat", "Onion"], stop=stop
+    ))
+    assert len(results) == 1
+    assert log == ["open", "quit"]
+
+
+def _lookup_with_markets(monkeypatch, data, delays=None):
+    """
+    Look up Rice from Mohali district, whose markets are A, B and C, where
+    data maps market -> records and delays maps market -> seconds to wait.
+    Returns the result and the markets scraped.
+    """
+    scraped = []
+    lock = threading.Lock()
+
+    def http(state, district, market, commodity, *args, **kwargs):
+        with lock:
+            scraped.append(market)
+        time.sleep((delays or {}).get(market, 0))
+        return data.get(market, [])
+
+    monkeypatch.setattr(
+        cpt, "find_nearest_location",
+        lambda lat, lon: {"state": "Punjab", "district": "Mohali", "distance": 1.0}
+    )
+    monkeypatch.setattr(cpt, "get_markets_in_district", lambda state, district: ["A", "B", "C"])
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    return cpt._lookup_commodity_prices(30.7, 76.7, ["Rice"])["Rice"], scraped
+
+
+RICE = [{"Modal Price": "2000", "Price Date": "05 Jan 2024"}]
+
+
+def test_lookup_prefers_earlier_market_in_window(monkeypatch):
+    result, _ = _lookup_with_markets(monkeypatch, {"A": RICE, "B": RICE}, delays={"A": 0.05})
+    assert result["market"] == "A"
+
+
+def test_lookup_skips_markets_without_data(monkeypatch):
+    result, _ = _lookup_with_markets(monkeypatch, {"C": RICE}, delays={"A": 0.02})
+    assert result["market"] == "C"
+    assert result["data_points"] == 1
+
+
+def test_lookup_stops_after_the_window_with_data(monkeypatch):
+    result, scraped = _lookup_with_markets(monkeypatch, {"B": RICE})
+    assert result["market"] == "B"
+    # C may be skipped once A and B have answered; alternates never start
+    assert {"A", "B"} <= set(scraped) <= {"A", "B", "C"}
+
+
+def test_lookup_falls_back_to_alternate_markets(monkeypatch):
+    result, scraped = _lookup_with_markets(monkeypatch, {"Ludhiana": RICE})
+    assert (result["district"], result["market"]) == ("Ludhiana", "Ludhiana")
+    assert sorted(scraped[:3]) == ["A", "B", "C"]
+
+
+def test_concurrent_batches_respect_browser_limit(monkeypatch):
+    monkeypatch.setattr(cpt, "_BROWSER_SEM", threading.Semaphore(2))
+    open_drivers = []
+    peak = []
+    lock = threading.Lock()
+
+    class Driver:
+        def __init__(self):
+            with lock:
+                open_drivers.append(self)
+                peak.append(len(open_drivers))
+
+        def quit(self):
+            with lock:
+                open_drivers.remove(self)
+
+    def http(*args, **kwargs):
+        raise RuntimeError("form changed")
+
+    def selenium(driver, state, district, market, commodity, *args):
+        time.sleep(0.01)
+        return [{"Commodity": commodity}]
+
+    monkeypatch.setattr(cpt, "_scrape_commodity_http", http)
+    monkeypatch.setattr(cpt, "_scrape_commodity_selenium", selenium)
+    monkeypatch.setattr(cpt, "_open_driver", lambda debug: Driver())
+
+    threads = [
+        threading.Thread(
+            target=lambda market=market: list(cpt.scrape_commodity_batch("Punjab", "Mohali", market, ["Rice"])),
+            daemon=True
+        )
+        for market in ["A", "B", "C", "D", "E", "F"]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert len(peak) == 6
+    assert max(peak) <= 2
+
+
+def test_haversine_distance_matches_vectorized_version():
+    distance = cpt.haversine_distance((30.70, 76.72), (31.63, 74.87))
+    expected = cpt.haversine_np(np.array([31.63]), np.array([74.87]), 30.70, 76.72)[0]
+    assert distance == pytest.approx(expected)
+    # One degree of latitude is about 111.2 km
+    assert cpt.haversine_distance((30.0, 76.0), (31.0, 76.0)) == pytest.approx(111.19, abs=0.01)
+    assert cpt.haversine_distance((30.7, 76.7), (30.7, 76.7)) == 0.0
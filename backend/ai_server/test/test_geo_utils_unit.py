@@ -0,0 +1,206 @@
+"""
+Unit tests for geo_utils' reverse geocoding cache and nearest-market search.
+These run offline; the Nominatim session is stubbed.
+"""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+import tools.geo_utils as geo_utils
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeNominatim:
+    """Answers every reverse geocoding request with the same address."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append((params["lat"], params["lon"]))
+        return FakeResponse({"address": {"state": "Punjab", "state_district": "Mohali", "county": "Kharar"}})
+
+
+class FakeTime:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    fake = FakeNominatim()
+    monkeypatch.setattr(geo_utils, "_nominatim_session", fake)
+    geo_utils._reverse_geocode.cache_clear()
+    yield fake
+    geo_utils._reverse_geocode.cache_clear()
+
+
+ADDRESS = {"State": "Punjab", "County": "Kharar", "District": "Mohali"}
+
+
+def test_geocode_cache_round_trip():
+    assert geo_utils._geocode_cache_get(30.7, 76.7) is None
+    geo_utils._geocode_cache_put(30.7, 76.7, ADDRESS)
+    assert geo_utils._geocode_cache_get(30.7, 76.7) == ADDRESS
+
+
+def test_geocode_cache_expires(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(geo_utils, "time", clock)
+    geo_utils._geocode_cache_put(30.7, 76.7, ADDRESS)
+
+    clock.now += geo_utils.GEOCODE_CACHE_MAX_AGE
+    assert geo_utils._geocode_cache_get(30.7, 76.7) == ADDRESS
+    clock.now += 1
+    assert geo_utils._geocode_cache_get(30.7, 76.7) is None
+
+
+def test_geocode_cache_creates_schema_for_each_file(monkeypatch, tmp_path):
+    geo_utils._geocode_cache_put(30.7, 76.7, ADDRESS)
+    monkeypatch.setattr(geo_utils, "GEOCODE_CACHE_FILE", tmp_path / "other.db")
+    assert geo_utils._geocode_cache_get(30.7, 76.7) is None
+    geo_utils._geocode_cache_put(30.7, 76.7, ADDRESS)
+    assert geo_utils._geocode_cache_get(30.7, 76.7) == ADDRESS
+
+
+def test_reverse_geocoding_survives_restarts(nominatim):
+    assert geo_utils.get_state_district(30.7001, 76.7001) == ADDRESS
+    assert nominatim.requests == [(30.7, 76.7)]
+
+    # A new process starts with an empty in-memory cache
+    geo_utils._reverse_geocode.cache_clear()
+    assert geo_utils.get_state_district(30.7001, 76.7001) == ADDRESS
+    assert nominatim.requests == [(30.7, 76.7)]
+
+
+def test_nearby_points_share_one_request(nominatim):
+    geo_utils.get_state_district(30.70001, 76.70001)
+    geo_utils.get_state_district(30.70004, 76.69996)
+    geo_utils.get_state_district(30.71, 76.7)
+    assert nominatim.requests == [(30.7, 76.7), (30.71, 76.7)]
+
+
+def test_reverse_geocoding_results_are_copies(nominatim):
+    result = geo_utils.get_state_district(30.7, 76.7)
+    result["State"] = "Haryana"
+    assert geo_utils.get_state_district(30.7, 76.7)["State"] == "Punjab"
+
+
+def _random_markets(count, seed=1):
+    rng = random.Random(seed)
+    return {
+        "State": {
+            f"District {d}": {
+                f"Market {d}-{m}": [rng.uniform(8, 35), rng.uniform(68, 95)]
+                for m in range(count // 10)
+            }
+            for d in range(10)
+        }
+    }
+
+
+@pytest.fixture
+def market_index(monkeypatch, tmp_path):
+    """Build the market index from the given market data."""
+    def build(markets):
+        path = tmp_path / "markets.json"
+        path.write_text(json.dumps(markets))
+        monkeypatch.setattr(geo_utils, "MARKETS_FILE", path)
+        geo_utils._load_market_index.cache_clear()
+        return geo_utils._market_index()
+    yield build
+    geo_utils._load_market_index.cache_clear()
+
+
+def _brute_force_row(index, rows, lat, lon):
+    return min(
+        rows,
+        key=lambda row: geo_utils.calculate_distance((lat, lon), (float(index.lats[row]), float(index.lons[row])))
+    )
+
+
+def _query_points(count=200, seed=2):
+    rng = random.Random(seed)
+    return [(rng.uniform(5, 38), rng.uniform(65, 98)) for _ in range(count)]
+
+
+def test_tree_and_scan_find_the_nearest_market(market_index):
+    index = market_index(_random_markets(500))
+    assert index.tree is not None
+    scan = index._replace(tree=None)
+    rows = np.arange(len(index.lats))
+
+    for lat, lon in _query_points():
+        expected = _brute_force_row(index, rows, lat, lon)
+        assert geo_utils._nearest_market_row(index, rows, lat, lon) == expected
+        assert geo_utils._nearest_market_row(scan, rows, lat, lon) == expected
+
+
+def test_candidates_are_rechecked_with_calculate_distance(market_index, monkeypatch):
+    index = market_index(_random_markets(500))
+    scan = index._replace(tree=None)
+    rows = np.arange(len(index.lats))
+    haversine = geo_utils.calculate_distance
+
+    # Stands in for geopy's geodesic: within 1% of
+    # haversine, but ranks near-equidistant markets differently
+    def geodesic(coord1, coord2):
+        return haversine(coord1, coord2) * (1 + 0.009 * np.sin(coord2[0] * 50))
+
+    monkeypatch.setattr(geo_utils, "calculate_distance", geodesic)
+    for lat, lon in _query_points():
+        expected = _brute_force_row(index, rows, lat, lon)
+        assert geo_utils._nearest_market_row(index, rows, lat, lon) == expected
+        assert geo_utils._nearest_market_row(scan, rows, lat, lon) == expected
+        subset = rows[::3]
+        assert geo_utils._nearest_market_row(index, subset, lat, lon) == _brute_force_row(index, subset, lat, lon)
+
+
+def test_markets_sharing_coordinates_go_to_the_first(market_index):
+    index = market_index({"State": {"District": {"B": [30.7, 76.7], "A": [30.7, 76.7], "C": [31.0, 77.0]}}})
+    rows = np.arange(len(index.lats))
+    assert geo_utils._nearest_market_row(index, rows, 30.6, 76.6) == 0
+    assert geo_utils._nearest_market_row(index._replace(tree=None), rows, 30.6, 76.6) == 0
+
+
+def test_no_rows_means_no_market(market_index):
+    index = market_index(_random_markets(20))
+    assert geo_utils._nearest_market_row(index, np.empty(0, dtype=np.intp), 30.7, 76.7) is None
+
+
+@pytest.mark.parametrize("coords, expected", [
+    ([30.7, 76.7], (30.7, 76.7)),
+    (["30.7", "76.7"], (30.7, 76.7)),
+    (None, None),
+    ([], None),
+    ([30.7], None),
+    ([30.7, 76.7, 0.0], None),
+    (["north", 76.7], None),
+    ([None, 76.7], None),
+    ([91.0, 76.7], None),
+    ([30.7, -181.0], None),
+])
+def test_market_coordinates(coords, expected):
+    assert geo_utils._market_coordinates(coords) == expected
+
+
+def test_markets_without_valid_coordinates_are_skipped(market_index):
+    index = market_index({"State": {"District": {"A": None, "B": [30.7, 76.7], "C": ["x", 1], "D": [31.0, 77.0]}}})
+    assert [market for _, _, market in index.meta] == ["B", "D"]
+    assert index.districts["State"]["District"] == range(0, 2)
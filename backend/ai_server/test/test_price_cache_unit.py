@@ -0,0 +1,102 @@
+"""
+Unit tests for the commodity price tool's on-disk price cache.
+These run offline; nothing here contacts Agmarknet.
+"""
+
+import tools.commodity_price_tool as cpt
+
+
+def test_price_cache_expires_after_max_age(clock):
+    records = [{"Modal Price": "2000"}]
+    cpt._price_cache_put("key", records)
+    cpt._price_memory.clear()
+
+    clock.now += 99
+    assert cpt._price_cache_get("key", 100) == records
+    cpt._price_memory.clear()
+    clock.now += 2
+    assert cpt._price_cache_get("key", 100) is None
+
+
+def test_price_cache_miss():
+    assert cpt._price_cache_get("missing", float("inf")) is None
+
+
+def test_price_cache_creates_schema_for_each_file(monkeypatch, tmp_path):
+    cpt._price_cache_put("key", [{"Modal Price": "2000"}])
+    cpt._price_memory.clear()
+
+    monkeypatch.setattr(cpt, "PRICE_CACHE_FILE", tmp_path / "other.db")
+    assert cpt._price_cache_get("key", float("inf")) is None
+    cpt._price_cache_put("key", [])
+    cpt._price_memory.clear()
+    assert cpt._price_cache_get("key", float("inf")) == []
+
+
+def test_empty_results_use_the_shorter_ttl(clock):
+    cpt._price_cache_put("empty", [])
+    max_age = cpt.EMPTY_RESULT_MAX_AGE * 10
+
+    clock.now += cpt.EMPTY_RESULT_MAX_AGE - 1
+    assert cpt._price_cache_get("empty", max_age) == []
+    clock.now += 2
+    assert cpt._price_cache_get("empty", max_age) is None
+    # A shorter max_age still wins over EMPTY_RESULT_MAX_AGE
+    assert cpt._price_cache_get("empty", 1) is None
+
+
+def test_clear_empty_price_cache_keeps_results_with_data():
+    cpt._price_cache_put("empty", [])
+    cpt._price_cache_put("full", [{"Modal Price": "2000"}])
+    cpt.clear_empty_price_cache()
+
+    assert cpt._price_cache_get("empty", float("inf")) is None
+    assert cpt._price_cache_get("full", float("inf")) == [{"Modal Price": "2000"}]
+
+
+def test_memory_cache_returns_copies():
+    cpt._price_cache_put("key", [{"Modal Price": "2000"}])
+
+    records = cpt._price_cache_get("key", float("inf"))
+    records[0]["Modal Price"] = "0"
+    records.append({"Modal Price": "1"})
+    assert cpt._price_cache_get("key", float("inf")) == [{"Modal Price": "2000"}]
+
+
+def test_memory_cache_is_independent_of_the_stored_list():
+    records = [{"Modal Price": "2000"}]
+    cpt._price_cache_put("key", records)
+    records[0]["Modal Price"] = "0"
+    assert cpt._price_cache_get("key", float("inf")) == [{"Modal Price": "2000"}]
+
+
+def test_memory_cache_respects_max_age(clock):
+    records = [{"Modal Price": "2000"}]
+    cpt._price_cache_put("key", records)
+
+    clock.now += 99
+    assert cpt._price_cache_get("key", 100) == records
+    clock.now += 2
+    assert cpt._price_cache_get("key", 100) is None
+    # An expired entry is still there for serving stale data
+    assert cpt._price_cache_get("key", float("inf")) == records
+
+
+def test_memory_cache_entries_reload_from_disk_after_ttl(clock):
+    cpt._price_cache_put("key", [{"Modal Price": "2000"}])
+    with cpt._price_memory_lock:
+        loaded_at, fetched_at, _ = cpt._price_memory["key"]
+        cpt._price_memory["key"] = (loaded_at, fetched_at, [{"Modal Price": "stale"}])
+
+    assert cpt._price_cache_get("key", float("inf")) == [{"Modal Price": "stale"}]
+    clock.now += cpt.PRICE_MEMORY_CACHE_TTL + 1
+    assert cpt._price_cache_get("key", float("inf")) == [{"Modal Price": "2000"}]
+
+
+def test_memory_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(cpt, "PRICE_MEMORY_CACHE_SIZE", 2)
+    cpt._price_cache_put("a", [])
+    cpt._price_cache_put("b", [])
+    cpt._price_cache_get("a", float("inf"))
+    cpt._price_cache_put("c", [])
+    assert list(cpt._price_memory) == ["a", "c"]
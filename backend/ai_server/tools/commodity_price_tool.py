@@ -10,27 +10,269 @@ import time
 import json
 import os
 import math
-from typing import Dict, List, Tuple, Optional, Union, Any
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Tuple, Optional, Union, Any, NamedTuple, Iterator
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (
+    NoSuchElementException, StaleElementReferenceException, TimeoutException
+)
 from bs4 import BeautifulSoup
 
+from .geo_utils import EARTH_RADIUS_KM, _unit_xyz
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+try:
+    from lxml import html as lxml_html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Define paths to data files
 DATA_DIR = Path(__file__).parent.parent / "data"
 DISTRICTS_FILE = DATA_DIR / "districts_database.json"
 MARKETS_FILE = DATA_DIR / "markets_database.json"
+PRICE_CACHE_FILE = DATA_DIR / "price_cache.db"
+
+# Agmarknet prices change at most once a day
+PRICE_CACHE_MAX_AGE = 12 * 60 * 60  # seconds
+
+# Markets with no data for a commodity are remembered for a shorter time,
+# since an empty table may just be a temporary gap
+EMPTY_RESULT_MAX_AGE = 60 * 60  # seconds
+
+# Hot entries are also kept in memory so repeat lookups skip sqlite
+PRICE_MEMORY_CACHE_SIZE = 1024
+PRICE_MEMORY_CACHE_TTL = 5 * 60  # seconds
+
+# Date format used in Agmarknet result tables, e.g. "05 Mar 2023"
+PRICE_DATE_FORMAT = '%d %b %Y'
+# Date format the Agmarknet search form accepts, e.g. "05-Mar-2023"
+AGMARKNET_DATE_FORMAT = '%d-%b-%Y'
+
+# Default date range per day, see _default_date_range
+_DEFAULT_DATE_CACHE: Dict[date, Tuple[str, str]] = {}
+
+# Half-width in degrees of the box searched first for the nearest district
+NEAREST_SEARCH_BOX_DEGREES = 5.0
+# Size in degrees of the tiles nearest-district candidates are grouped by.
+# Tiles are keyed by their centre in float degrees, i.e. the query point
+# rounded to one decimal place, not by integer cell indices.
+TILE_DEGREES = 0.1
+
+# Agmarknet search page and the IDs of the result tables it can render
+AGMARKNET_URL = "https://agmarknet.gov.in/SearchCmmMkt.aspx"
+RESULT_TABLE_IDS = ['cphBody_GridViewBoth', 'cphBody_GridPriceData', 'cphBody_GridArrivalData']
+HTTP_TIMEOUT = (5, 30)  # (connect, read) seconds
+HTTP_HEADERS = {
+    "User-Agent": "Farmora/1.0 (farmora.app; contact@farmora.app)",
+    "Connection": "keep-alive"
+}
+
+# Connection pool shared by every Agmarknet request so TCP/TLS connections are
+# reused across markets and commodities. Only idempotent requests are retried.
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504))
+)
+
+# Upper bound on simultaneous scrapes so parallel lookups don't trip
+# Agmarknet's per-client rate limits
+_AGMARKNET_SEM = threading.Semaphore(4)
+# Upper bound on Chrome instances alive at once. Locks are always taken in
+# the order _BROWSER_SEM, then _price_key_lock, then _AGMARKNET_SEM, so
+# single and batch scrapes can't deadlock each other.
+MAX_BROWSERS = 2
+_BROWSER_SEM = threading.Semaphore(MAX_BROWSERS)
+MAX_PARALLEL_COMMODITIES = 8
+# Number of candidate markets tried at the same time for a lookup
+MARKET_FANOUT = 3
+
+# After this many scrapes in a row fail, stop contacting Agmarknet for
+# CIRCUIT_COOLDOWN seconds so an outage doesn't cost a timeout per market
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30
+_circuit = {"failures": 0, "open_until": 0.0}
+_circuit_lock = threading.Lock()
+
+# Seconds to wait for an Agmarknet postback to start after changing a dropdown
+POSTBACK_START_TIMEOUT = 2
+
+# Sets an input's value and notifies the page as if it had been typed
+SET_INPUT_VALUE_JS = (
+    "arguments[0].value = arguments[1];"
+    "arguments[0].dispatchEvent(new Event('input', {bubbles: true}));"
+    "arguments[0].dispatchEvent(new Event('change', {bubbles: true}));"
+)
+
+# In-memory layer of the price cache: key -> (loaded_at, fetched_at, records)
+_price_memory: "OrderedDict[str, Tuple[float, float, List[Dict[str, str]]]]" = OrderedDict()
+_price_memory_lock = threading.Lock()
+_PRICE_KEY_LOCKS = [threading.Lock() for _ in range(64)]
+
+# (state, district, market, commodity) -> [successes, attempts, data points],
+# loaded lazily by _load_market_stats
+_market_stats: Optional[Dict[Tuple[str, str, str, str], List[int]]] = None
+_market_stats_lock = threading.Lock()
+
+# Common crop seasons in India, keyed by lowercase commodity name
+CROP_SEASONS = MappingProxyType({
+    "rice": MappingProxyType({
+        "growing_season": "Kharif (June-July to October-November)",
+        "harvesting_period": "September-December",
+        "expected_next_harvest": "October-November"
+    }),
+    "wheat": MappingProxyType({
+        "growing_season": "Rabi (October-December to March-April)",
+        "harvesting_period": "February-May", 
+        "expected_next_harvest": "March-April"
+    }),
+    "maize": MappingProxyType({
+        "growing_season": "Both Kharif and Rabi seasons",
+        "harvesting_period": "September-October (Kharif), February-March (Rabi)",
+        "expected_next_harvest": "Varies by region"
+    }),
+    "potato": MappingProxyType({
+        "growing_season": "Rabi (October-November to February-March)",
+        "harvesting_period": "January-March",
+        "expected_next_harvest": "January-February"
+    }),
+    "onion": MappingProxyType({
+        "growing_season": "Kharif, late Kharif, and Rabi",
+        "harvesting_period": "Year-round in different regions",
+        "expected_next_harvest": "Varies by region"
+    }),
+    "tomato": MappingProxyType({
+        "growing_season": "Year-round in different regions",
+        "harvesting_period": "Varies by region",
+        "expected_next_harvest": "Varies by region"
+    }),
+    "apple": MappingProxyType({
+        "growing_season": "Spring (March-April)",
+        "harvesting_period": "July-October",
+        "expected_next_harvest": "August-September"
+    }),
+    "strawberry": MappingProxyType({
+        "growing_season": "October-November",
+        "harvesting_period": "January-March",
+        "expected_next_harvest": "January-February"
+    })
+    # Add more crops as needed
+})
+
+# Major agricultural markets of each state, tried when the nearest district
+# has no data
+ALTERNATE_MARKETS = MappingProxyType({
+    "Punjab": [
+        {"district": "Ludhiana", "market": "Ludhiana"},
+        {"district": "Amritsar", "market": "Amritsar"},
+        {"district": "Patiala", "market": "Patiala"},
+        {"district": "Jalandhar", "market": "Jalandhar"},
+        {"district": "Bathinda", "market": "Bathinda"}
+    ],
+    "Haryana": [
+        {"district": "Karnal", "market": "Karnal"},
+        {"district": "Ambala", "market": "Ambala"},
+        {"district": "Hisar", "market": "Hisar"},
+        {"district": "Gurugram", "market": "Gurugram"},
+        {"district": "Kurukshetra", "market": "Kurukshetra"}
+    ],
+    "Uttar Pradesh": [
+        {"district": "Lucknow", "market": "Lucknow"},
+        {"district": "Kanpur", "market": "Kanpur"},
+        {"district": "Varanasi", "market": "Varanasi"},
+        {"district": "Agra", "market": "Agra"},
+        {"district": "Meerut", "market": "Meerut"}
+    ],
+    "Himachal Pradesh": [
+        {"district": "Shimla", "market": "Shimla"},
+        {"district": "Solan", "market": "Solan"},
+        {"district": "Kangra", "market": "Dharamshala"},
+        {"district": "Kullu", "market": "Kullu"},
+        {"district": "Mandi", "market": "Mandi"}
+    ]
+})
+# Used for states not listed above
+DEFAULT_ALTERNATE_MARKETS = ({"district": "Ludhiana", "market": "Ludhiana"},)
+
+# Seasonal info reported when a lookup fails outright
+_UNAVAILABLE_SEASONS = MappingProxyType({
+    "growing_season": "Data not available",
+    "harvesting_period": "Data not available",
+    "expected_next_harvest": "Data not available"
+})
 
 # Ensure the data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
+def _json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON, with orjson when it is installed."""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize to a JSON string, with orjson when it is installed."""
+    return orjson.dumps(obj).decode("utf-8") if HAS_ORJSON else json.dumps(obj)
+
+def _load_json(path: Path) -> Any:
+    """
+    Read and parse a JSON data file in one go. orjson's decode errors are
+    json.JSONDecodeError subclasses, so callers handle both parsers alike.
+    """
+    return _json_loads(Path(path).read_bytes())
+
+def haversine_np(lats: np.ndarray, lons: np.ndarray, lat: float, lon: float) -> np.ndarray:
+    """
+    Vectorized Haversine distance from one point to many points.
+    
+    Args:
+        lats: Array of latitudes in degrees
+        lons: Array of longitudes in degrees
+        lat: Latitude of the query point in degrees
+        lon: Longitude of the query point in degrees
+        
+    Returns:
+        Array of float64 distances in kilometers, one per input point.
+        The math runs in the precision of the input arrays.
+    """
+    lats_rad = np.radians(lats)
+    lat_rad = math.radians(lat)
+    dlat = lats_rad - lat_rad
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lats_rad) * math.cos(lat_rad) * np.sin(dlon / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).astype(np.float64, copy=False)
+
 def haversine_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """
     Calculate the distance between two coordinates in kilometers using the Haversine formula.
+    This is haversine_np for a single pair of points.
     
     Args:
         coord1: First coordinate (latitude, longitude)
@@ -39,34 +281,87 @@ def haversine_distance(coord1: Tuple[float, float], coord2: Tuple[float, float])
     Returns:
         Distance in kilometers
     """
-    # Try to use geopy if available
-    try:
-        from geopy.distance import geodesic
-        return geodesic(coord1, coord2).kilometers
-    except ImportError:
-        # Fallback to haversine formula
-        lat1, lon1 = coord1
-        lat2, lon2 = coord2
-        
-        # Convert latitude and longitude from degrees to radians
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-        
-        # Haversine formula
-        dlon = lon2_rad - lon1_rad
-        dlat = lat2_rad - lat1_rad
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        # Earth's radius in kilometers
-        radius = 6371.0
+    lat1, lon1 = coord1
+    lat2, lon2 = coord2
+    return float(haversine_np(np.array([lat2], dtype=np.float64), np.array([lon2], dtype=np.float64), lat1, lon1)[0])
+
+class _DistrictIndex(NamedTuple):
+    """District coordinates and the per-district values lookups reuse."""
+    lats: np.ndarray  # degrees, float32
+    lons: np.ndarray  # degrees, float32
+    lat_rad: np.ndarray
+    lon_rad: np.ndarray
+    cos_lat: np.ndarray
+    meta: List[Tuple[str, str]]  # (state, district) per coordinate
+    tree: Optional["cKDTree"]  # over unit-sphere coordinates, None without scipy
+
+@lru_cache(maxsize=1)
+def _load_districts(mtime: float) -> _DistrictIndex:
+    """
+    Load the districts database and build the index used for nearest lookups.
+    
+    The result is cached per file modification time, so the JSON is parsed
+    once per process and re-parsed only when the file changes on disk.
+    District latitudes never change between queries, so their radians and
+    cosines are computed here rather than on every lookup.
+    
+    Args:
+        mtime: Modification time of DISTRICTS_FILE (cache key)
         
-        # Calculate the distance
-        distance = radius * c
+    Returns:
+        _DistrictIndex over every district that has coordinates
+    """
+    districts_data = _load_json(DISTRICTS_FILE)
+    
+    # Districts without coordinates can never be the nearest one
+    located = [d for d in districts_data if d.get("latitude") and d.get("longitude")]
+    
+    # float32 is ample precision for district centroids and halves the
+    # memory scanned per lookup
+    lats = np.fromiter((float(d["latitude"]) for d in located), dtype=np.float32, count=len(located))
+    lons = np.fromiter((float(d["longitude"]) for d in located), dtype=np.float32, count=len(located))
+    meta = [(d.get("state", "Punjab"), d.get("district", "Ludhiana")) for d in located]
+    tree = cKDTree(_unit_xyz(lats, lons)) if HAS_SCIPY and meta else None
+    
+    lat_rad = np.radians(lats)
+    return _DistrictIndex(lats, lons, lat_rad, np.radians(lons), np.cos(lat_rad), meta, tree)
+
+def _haversine_index(index: _DistrictIndex, rows, lat: float, lon: float) -> np.ndarray:
+    """
+    Haversine distance in kilometers from (lat, lon) to the given rows of the
+    district index, using its precomputed radians and cosines.
+    """
+    lat_rad = math.radians(lat)
+    dlat = index.lat_rad[rows] - lat_rad
+    dlon = index.lon_rad[rows] - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + index.cos_lat[rows] * math.cos(lat_rad) * np.sin(dlon / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).astype(np.float64, copy=False)
+
+def _nearest_scan(index: _DistrictIndex, lat: float, lon: float) -> Tuple[int, float]:
+    """
+    Find the index of and distance to the district nearest (lat, lon) by a
+    vectorized scan, trying only the districts in a box around it first.
+    """
+    # Cheap box test so trigonometry runs only on nearby points
+    dlat = np.abs(index.lats - lat)
+    dlon = np.abs((index.lons - lon + 180) % 360 - 180)
+    cand_idx = np.flatnonzero((dlat < NEAREST_SEARCH_BOX_DEGREES) & (dlon < NEAREST_SEARCH_BOX_DEGREES))
+    
+    if cand_idx.size:
+        distances = _haversine_index(index, cand_idx, lat, lon)
+        best = int(np.argmin(distances))
         
-        return distance
+        # Every point outside the box is at least this far away, so a closer
+        # winner inside the box is the overall nearest
+        box = math.radians(NEAREST_SEARCH_BOX_DEGREES)
+        outside = EARTH_RADIUS_KM * min(box, math.asin(abs(math.cos(math.radians(lat))) * math.sin(box)))
+        if distances[best] <= outside:
+            return int(cand_idx[best]), float(distances[best])
+    
+    # Distances to every point in one pass, then pick the nearest
+    distances = _haversine_index(index, slice(None), lat, lon)
+    idx = int(np.argmin(distances))
+    return idx, float(distances[idx])
 
 def find_nearest_location(lat: float, lon: float) -> Dict[str, Any]:
     """
@@ -83,38 +378,91 @@ def find_nearest_location(lat: float, lon: float) -> Dict[str, Any]:
     if not os.path.exists(DISTRICTS_FILE):
         return {"state": "Punjab", "district": "Ludhiana", "distance": 0}
     
-    # Load district coordinates database
+    # Users query from the same farms again and again, so answers are cached
+    # per ~100 m grid cell; the file's mtime keeps them in step with the data
     try:
-        with open(DISTRICTS_FILE, 'r') as f:
-            districts_data = json.load(f)
+        return dict(_nearest_location_cached(
+            os.stat(DISTRICTS_FILE).st_mtime, round(lat, 3), round(lon, 3)
+        ))
     except (json.JSONDecodeError, FileNotFoundError):
         return {"state": "Punjab", "district": "Ludhiana", "distance": 0}
+
+@lru_cache(maxsize=4096)
+def _tile_candidates(mtime: float, tile_lat: float, tile_lon: float) -> np.ndarray:
+    """
+    Indices of the districts that can be the nearest one to some point of
+    the 0.1 degree (~10 km) tile centred on (tile_lat, tile_lon), which are
+    the query coordinates rounded to one decimal place.
     
-    # Find nearest district
-    nearest_district = None
-    min_distance = float('inf')
+    If the nearest district to the tile centre is d0 away and no point of
+    the tile is more than h from the centre, the nearest district to any
+    point of the tile is within d0 + 2h of the centre. Queries from the
+    same region thus scan a handful of districts instead of all of them.
+    """
+    index = _load_districts(mtime)
+    _, nearest = _nearest_scan(index, tile_lat, tile_lon)
     
-    for district_entry in districts_data:
-        dist_lat = district_entry.get("latitude")
-        dist_lon = district_entry.get("longitude")
-        
-        if not (dist_lat and dist_lon):
-            continue
-            
-        distance = haversine_distance((lat, lon), (dist_lat, dist_lon))
-        
-        if distance < min_distance:
-            min_distance = distance
-            nearest_district = district_entry
+    half = TILE_DEGREES / 2
+    corner_lats = np.array([tile_lat - half, tile_lat - half, tile_lat + half, tile_lat + half])
+    corner_lons = np.array([tile_lon - half, tile_lon + half, tile_lon - half, tile_lon + half])
+    h = float(haversine_np(corner_lats, corner_lons, tile_lat, tile_lon).max())
     
-    if nearest_district:
-        return {
-            "state": nearest_district.get("state", "Punjab"),
-            "district": nearest_district.get("district", "Ludhiana"),
-            "distance": min_distance
-        }
-    else:
+    # Small margin for the float32 coordinates
+    reach = (nearest + 2 * h) * 1.01 + 0.01
+    distances = _haversine_index(index, slice(None), tile_lat, tile_lon)
+    return np.flatnonzero(distances <= reach)
+
+@lru_cache(maxsize=4096)
+def _nearest_location_cached(mtime: float, lat: float, lon: float) -> Dict[str, Any]:
+    """
+    Uncached body of find_nearest_location.
+    The caller must copy the result, as it is shared between calls.
+    """
+    # Load district coordinates database
+    index = _load_districts(mtime)
+    
+    if not index.meta:
         return {"state": "Punjab", "district": "Ludhiana", "distance": 0}
+    
+    if index.tree is not None:
+        # Nearest by chord length is nearest by great-circle distance too
+        chord, idx = index.tree.query(_unit_xyz(lat, lon), k=1)
+        distance = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+    else:
+        # Only the districts that can be nearest to somewhere in this tile
+        candidates = _tile_candidates(mtime, round(lat, 1), round(lon, 1))
+        distances = _haversine_index(index, candidates, lat, lon)
+        best = int(np.argmin(distances))
+        idx, distance = candidates[best], float(distances[best])
+    state, district = index.meta[int(idx)]
+    
+    return {
+        "state": state,
+        "district": district,
+        "distance": distance
+    }
+
+@lru_cache(maxsize=1)
+def _load_markets(mtime: float) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Load the markets database and index it by (state, district).
+    
+    The result is cached per file modification time, so the lookup in
+    get_markets_in_district is a single dictionary hit.
+    
+    Args:
+        mtime: Modification time of MARKETS_FILE (cache key)
+        
+    Returns:
+        Dictionary mapping (state, district) to the list of market names
+    """
+    markets_data = _load_json(MARKETS_FILE)
+    
+    index = {}
+    for market_entry in markets_data:
+        key = (market_entry.get("state"), market_entry.get("district"))
+        index.setdefault(key, []).append(market_entry.get("market"))
+    return index
 
 def get_markets_in_district(state: str, district: str) -> List[str]:
     """
@@ -133,19 +481,13 @@ def get_markets_in_district(state: str, district: str) -> List[str]:
     
     # Load markets database
     try:
-        with open(MARKETS_FILE, 'r') as f:
-            markets_data = json.load(f)
+        markets_index = _load_markets(os.stat(MARKETS_FILE).st_mtime)
     except (json.JSONDecodeError, FileNotFoundError):
         return ["Ludhiana"]  # Default fallback
     
-    # Extract markets for the specified district
-    district_markets = []
-    
-    for market_entry in markets_data:
-        if market_entry.get("state") == state and market_entry.get("district") == district:
-            district_markets.append(market_entry.get("market"))
-    
-    return district_markets if district_markets else ["Ludhiana"]
+    # Copy so callers can reorder the list without touching the cache
+    district_markets = markets_index.get((state, district))
+    return list(district_markets) if district_markets else ["Ludhiana"]
 
 def get_alternate_markets(state: str) -> List[Dict[str, str]]:
     """
@@ -157,40 +499,500 @@ def get_alternate_markets(state: str) -> List[Dict[str, str]]:
     Returns:
         List of dictionaries with market information
     """
-    # Map of states to their major agricultural markets
-    state_markets = {
-        "Punjab": [
-            {"district": "Ludhiana", "market": "Ludhiana"},
-            {"district": "Amritsar", "market": "Amritsar"},
-            {"district": "Patiala", "market": "Patiala"},
-            {"district": "Jalandhar", "market": "Jalandhar"},
-            {"district": "Bathinda", "market": "Bathinda"}
-        ],
-        "Haryana": [
-            {"district": "Karnal", "market": "Karnal"},
-            {"district": "Ambala", "market": "Ambala"},
-            {"district": "Hisar", "market": "Hisar"},
-            {"district": "Gurugram", "market": "Gurugram"},
-            {"district": "Kurukshetra", "market": "Kurukshetra"}
-        ],
-        "Uttar Pradesh": [
-            {"district": "Lucknow", "market": "Lucknow"},
-            {"district": "Kanpur", "market": "Kanpur"},
-            {"district": "Varanasi", "market": "Varanasi"},
-            {"district": "Agra", "market": "Agra"},
-            {"district": "Meerut", "market": "Meerut"}
-        ],
-        "Himachal Pradesh": [
-            {"district": "Shimla", "market": "Shimla"},
-            {"district": "Solan", "market": "Solan"},
-            {"district": "Kangra", "market": "Dharamshala"},
-            {"district": "Kullu", "market": "Kullu"},
-            {"district": "Mandi", "market": "Mandi"}
-        ]
-    }
+    # Return markets for the specified state or a default list, copied so
+    # callers can't modify the shared table
+    markets = ALTERNATE_MARKETS.get(state, DEFAULT_ALTERNATE_MARKETS)
+    return [dict(market_info) for market_info in markets]
+
+def _parse_results_table(table) -> List[Dict[str, str]]:
+    """
+    Convert an Agmarknet results table into a list of row dictionaries.
+    
+    Args:
+        table: BeautifulSoup <table> element holding the results
+        
+    Returns:
+        List of dictionaries keyed by the table headers (units stripped)
+    """
+    jsonList = []
+    
+    # Extract table headers
+    headers = []
+    header_row = table.find('tr')
+    if header_row:
+        headers = [th.get_text().strip() for th in header_row.find_all('th')]
+        
+    # Process data rows (skip header row and summary rows)
+    for row in table.find_all('tr')[1:]:  # Skip header row
+        # Skip summary rows (they have a different background color)
+        if 'background-color:#F9F9F9' in str(row):
+            continue
+            
+        cells = row.find_all('td')
+        if cells:
+            # Use the actual headers from the table for the keys
+            data = {}
+            for i, header in enumerate(headers):
+                if i < len(cells):
+                    # Clean up header name for use as a key
+                    clean_header = header.split('(')[0].strip()  # Remove units in parentheses
+                    data[clean_header] = cells[i].get_text().strip()
+            jsonList.append(data)
+    
+    return jsonList
+
+def _parse_results_table_lxml(table) -> List[Dict[str, str]]:
+    """
+    lxml version of _parse_results_table; returns records of the same shape.
+    
+    Args:
+        table: lxml <table> element holding the results
+    """
+    rows = table.xpath('.//tr')
+    if not rows:
+        return []
+    headers = [th.text_content().strip().split('(')[0].strip() for th in rows[0].xpath('.//th')]
+    
+    # Summary rows are marked by their background color
+    data_rows = table.xpath(
+        ".//tr[position() > 1]"
+        "[not(descendant-or-self::*[contains(@style, 'background-color:#F9F9F9')])]"
+    )
+    
+    jsonList = []
+    for row in data_rows:
+        cells = [td.text_content().strip() for td in row.xpath('.//td')]
+        if cells:
+            jsonList.append(dict(zip(headers, cells)))
+    return jsonList
+
+def _parse_results_page(page_html: str, table_ids: List[str] = RESULT_TABLE_IDS) -> Optional[List[Dict[str, str]]]:
+    """
+    Find the first of table_ids in an Agmarknet results page and parse it.
+    Uses lxml when it is installed, BeautifulSoup otherwise.
+    
+    Returns:
+        The parsed records, or None if none of the tables is on the page
+    """
+    if HAS_LXML:
+        root = lxml_html.fromstring(page_html)
+        for tid in table_ids:
+            tables = root.xpath('//table[@id=$tid]', tid=tid)
+            if tables:
+                return _parse_results_table_lxml(tables[0])
+        return None
+    
+    soup = BeautifulSoup(page_html, 'html.parser')
+    for tid in table_ids:
+        table = soup.find('table', id=tid)
+        if table:
+            return _parse_results_table(table)
+    return None
+
+def _closest_option(options: List[str], wanted: str) -> str:
+    """
+    Pick the dropdown option best matching wanted: an exact match, then a
+    case-insensitive one, then the first option containing it, and finally
+    the first option.
+    
+    Args:
+        options: Non-empty list of option texts
+        wanted: Text to look for
+    """
+    if wanted in options:
+        return wanted
+    
+    lowered = {}
+    for option in options:
+        lowered.setdefault(option.lower(), option)
+    want = wanted.lower()
+    return lowered.get(want) or next((lowered[k] for k in lowered if want in k), options[0])
+
+def _parse_table_html(table_html: str) -> List[Dict[str, str]]:
+    """Parse the HTML of a single results table, with lxml when available."""
+    if HAS_LXML:
+        return _parse_results_table_lxml(lxml_html.fromstring(table_html))
+    return _parse_results_table(BeautifulSoup(table_html, 'html.parser').find('table'))
+
+def _form_fields(soup: BeautifulSoup) -> Dict[str, str]:
+    """
+    Collect the ASP.NET form state (hidden fields, inputs and current dropdown
+    selections) that has to be posted back to the page.
+    """
+    fields = {}
+    for field in soup.find_all('input'):
+        name = field.get('name')
+        if not name or field.get('type') in ('submit', 'button', 'image'):
+            continue
+        fields[name] = field.get('value', '')
+    for select in soup.find_all('select'):
+        name = select.get('name')
+        if not name:
+            continue
+        selected = select.find('option', selected=True) or select.find('option')
+        fields[name] = selected.get('value', '') if selected else ''
+    return fields
+
+def _dropdown(soup: BeautifulSoup, dropdown_id: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Get the form field name and (value, text) options of a dropdown.
+    
+    Raises:
+        RuntimeError: If the dropdown is not on the page
+    """
+    select = soup.find('select', id=dropdown_id)
+    if select is None:
+        raise RuntimeError(f"Dropdown '{dropdown_id}' not found on the page")
+    options = [(o.get('value', ''), o.get_text().strip()) for o in select.find_all('option')]
+    return select.get('name'), options
+
+def _new_session() -> requests.Session:
+    """
+    Create a session for one form walk-through. Each walk-through needs its own
+    cookies, but all of them share the pooled connections of _HTTP_ADAPTER.
+    """
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    session.mount("https://", _HTTP_ADAPTER)
+    return session
+
+def _postback(
+    session: requests.Session,
+    soup: BeautifulSoup,
+    values: Dict[str, str],
+    event_target: str = ""
+) -> BeautifulSoup:
+    """
+    Post the page's form back to Agmarknet with some fields changed, the same
+    way the browser does when a dropdown with AutoPostBack changes.
+    """
+    return BeautifulSoup(_post_form(session, soup, values, event_target), 'html.parser')
+
+def _post_form(
+    session: requests.Session,
+    soup: BeautifulSoup,
+    values: Dict[str, str],
+    event_target: str = ""
+) -> str:
+    """Post the page's form with some fields changed and return the raw HTML."""
+    fields = _form_fields(soup)
+    fields.update(values)
+    fields["__EVENTTARGET"] = event_target
+    fields["__EVENTARGUMENT"] = ""
+    response = session.post(AGMARKNET_URL, data=fields, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.text
+
+def _scrape_commodity_http(
+    state: str,
+    district: str,
+    market: str,
+    commodity: str,
+    price_arrival: str,
+    date_from: str,
+    date_to: str,
+    debug: bool = False
+) -> List[Dict[str, str]]:
+    """
+    Fetch commodity data by replaying the Agmarknet search form over plain
+    HTTP instead of driving a browser.
+    
+    Raises:
+        ValueError: If the price type, commodity or state is not offered by the site
+        RuntimeError: If the form or the results table could not be handled
+    """
+    def save_debug_html(name, page):
+        """Save the page HTML if debug mode is on"""
+        if debug:
+            html_path = os.path.join(DATA_DIR, f"debug_{name}.html")
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(str(page))
+            print(f"[DEBUG] HTML saved as: {html_path}")
+    
+    def option_value(options, text):
+        return next((value for value, option_text in options if option_text == text), None)
+    
+    session = _new_session()
+    response = session.get(AGMARKNET_URL, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.text, 'html.parser')
+    save_debug_html("http_initial", soup)
+    
+    price_name, price_options = _dropdown(soup, 'ddlArrivalPrice')
+    price_value = option_value(price_options, price_arrival)
+    if price_value is None:
+        raise ValueError(f"Price/Arrival option '{price_arrival}' not found in dropdown.")
+    
+    commodity_name, commodity_options = _dropdown(soup, 'ddlCommodity')
+    commodity_value = option_value(commodity_options, commodity)
+    if commodity_value is None:
+        raise ValueError(f"Commodity '{commodity}' not found in dropdown.")
+    
+    state_name, state_options = _dropdown(soup, 'ddlState')
+    state_value = option_value(state_options, state)
+    if state_value is None:
+        raise ValueError(f"State '{state}' not found in dropdown.")
+    
+    # Changing the state posts back and fills in the district dropdown
+    values = {price_name: price_value, commodity_name: commodity_value, state_name: state_value}
+    soup = _postback(session, soup, values, event_target=state_name)
+    
+    district_name, district_options = _dropdown(soup, 'ddlDistrict')
+    district_options = [(v, t) for v, t in district_options if t != "--Select--"]
+    if not district_options:
+        raise RuntimeError("No valid district options available")
+    # Same flexible matching as the browser path
+    district_value = option_value(district_options, _closest_option([t for _, t in district_options], district))
+    
+    # Changing the district posts back and fills in the market dropdown
+    values[district_name] = district_value
+    soup = _postback(session, soup, values, event_target=district_name)
+    
+    market_name, market_options = _dropdown(soup, 'ddlMarket')
+    market_options = [(v, t) for v, t in market_options if t != "--Select--"]
+    if not market_options:
+        raise RuntimeError(f"No valid market options available for district {district}")
+    market_value = option_value(market_options, _closest_option([t for _, t in market_options], market))
+    values[market_name] = market_value
+    
+    # Dates and the Go button
+    for field_id, field_value in (('txtDate', date_from), ('txtDateTo', date_to)):
+        date_input = soup.find('input', id=field_id)
+        if date_input is None:
+            raise RuntimeError(f"Date input field '{field_id}' not found")
+        values[date_input.get('name')] = field_value
+    go_button = soup.find('input', id='btnGo')
+    if go_button is None:
+        raise RuntimeError("Go button not found")
+    values[go_button.get('name')] = go_button.get('value', 'Go')
+    
+    page = _post_form(session, soup, values)
+    save_debug_html("http_results", page)
+    
+    records = _parse_results_page(page)
+    if records is None:
+        raise RuntimeError("No data table found on the page")
+    
+    return records
+
+def _price_cache_key(*parts: Any) -> str:
+    """Build the price cache key for a scrape query."""
+    return hashlib.blake2b("|".join(str(p) for p in parts).encode("utf-8"), digest_size=16).hexdigest()
+
+# Cache files whose tables have already been created by this process
+_price_cache_ready = set()
+_price_cache_ready_lock = threading.Lock()
+
+def _price_cache_connect() -> sqlite3.Connection:
+    """Open the on-disk price cache, creating the tables the first time."""
+    conn = sqlite3.connect(PRICE_CACHE_FILE, timeout=10)
+    path = str(PRICE_CACHE_FILE)
+    if path in _price_cache_ready:
+        return conn
+    with _price_cache_ready_lock:
+        if path not in _price_cache_ready:
+            try:
+                conn.execute("CREATE TABLE IF NOT EXISTS prices (key TEXT PRIMARY KEY, ts REAL, payload TEXT)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS market_stats ("
+                    "state TEXT, district TEXT, market TEXT, commodity TEXT, "
+                    "successes INTEGER, attempts INTEGER, data_points INTEGER, "
+                    "PRIMARY KEY (state, district, market, commodity))"
+                )
+            except sqlite3.Error:
+                conn.close()
+                raise
+            _price_cache_ready.add(path)
+    return conn
+
+def _price_memory_put(key: str, fetched_at: float, records: List[Dict[str, str]]) -> None:
+    """
+    Remember a cache entry in memory, evicting the least recently used.
+    A copy is kept, so later changes to records don't reach the cache.
+    """
+    records = [dict(record) for record in records]
+    with _price_memory_lock:
+        _price_memory[key] = (time.time(), fetched_at, records)
+        _price_memory.move_to_end(key)
+        while len(_price_memory) > PRICE_MEMORY_CACHE_SIZE:
+            _price_memory.popitem(last=False)
+
+def _price_cache_get(key: str, max_age: float) -> Optional[List[Dict[str, str]]]:
+    """
+    Get cached scrape results if they are younger than max_age seconds
+    (EMPTY_RESULT_MAX_AGE at most for empty results). Cache problems are
+    treated as a miss. The records returned are the caller's own copy.
+    """
+    def fresh(fetched_at, records):
+        limit = max_age if records else min(max_age, EMPTY_RESULT_MAX_AGE)
+        return now - fetched_at < limit
+    
+    now = time.time()
+    with _price_memory_lock:
+        entry = _price_memory.get(key)
+        if entry is not None and now - entry[0] < PRICE_MEMORY_CACHE_TTL:
+            _price_memory.move_to_end(key)
+            if not fresh(entry[1], entry[2]):
+                return None
+            return [dict(record) for record in entry[2]]
+    
+    try:
+        with closing(_price_cache_connect()) as conn:
+            row = conn.execute("SELECT ts, payload FROM prices WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error:
+        return None
+    
+    if row is None:
+        return None
+    records = _json_loads(row[1])
+    _price_memory_put(key, row[0], records)
+    return records if fresh(row[0], records) else None
+
+def clear_empty_price_cache() -> None:
+    """
+    Forget every cached "no data" result, e.g. after Agmarknet publishes new
+    data, so those markets are scraped again on the next lookup.
+    """
+    with _price_memory_lock:
+        for key in [key for key, entry in _price_memory.items() if not entry[2]]:
+            del _price_memory[key]
+    try:
+        with closing(_price_cache_connect()) as conn, conn:
+            conn.execute("DELETE FROM prices WHERE payload = '[]'")
+    except sqlite3.Error:
+        pass
+
+def _price_key_lock(key: str) -> threading.Lock:
+    """
+    Lock held while scraping a cache key, so concurrent misses for the same
+    query trigger one scrape instead of several.
+    """
+    return _PRICE_KEY_LOCKS[hash(key) % len(_PRICE_KEY_LOCKS)]
+
+def _price_cache_put(key: str, records: List[Dict[str, str]]) -> None:
+    """Store scrape results in the price cache, ignoring cache errors."""
+    _price_memory_put(key, time.time(), records)
+    try:
+        with closing(_price_cache_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO prices (key, ts, payload) VALUES (?, ?, ?)",
+                (key, time.time(), _json_dumps(records))
+            )
+    except sqlite3.Error:
+        pass
+
+def _load_market_stats() -> Dict[Tuple[str, str, str, str], List[int]]:
+    """
+    Get the per-market scrape statistics, reading them from the price cache
+    database on first use so they survive restarts.
+    """
+    global _market_stats
+    with _market_stats_lock:
+        if _market_stats is None:
+            _market_stats = {}
+            try:
+                with closing(_price_cache_connect()) as conn:
+                    rows = conn.execute(
+                        "SELECT state, district, market, commodity, successes, attempts, data_points FROM market_stats"
+                    ).fetchall()
+            except sqlite3.Error:
+                rows = []
+            for state, district, market, commodity, successes, attempts, data_points in rows:
+                _market_stats[(state, district, market, commodity)] = [successes, attempts, data_points]
+        return _market_stats
+
+def _record_market_result(state: str, district: str, market: str, commodity: str, data_points: int) -> None:
+    """Count one scrape of a market for a commodity and whether it had data."""
+    stats = _load_market_stats()
+    key = (state, district, market, commodity)
+    with _market_stats_lock:
+        entry = stats.setdefault(key, [0, 0, 0])
+        entry[0] += 1 if data_points else 0
+        entry[1] += 1
+        entry[2] += data_points
+        row = (*key, *entry)
+    try:
+        with closing(_price_cache_connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO market_stats VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+    except sqlite3.Error:
+        pass
+
+def _market_score(state: str, district: str, market: str, commodities: List[str]) -> Tuple[float, float]:
+    """
+    How promising a market is for the given commodities, as (success rate,
+    average data points). Unseen markets score 0.5 so they keep their place
+    between markets known to work and markets known to come up empty.
+    """
+    stats = _load_market_stats()
+    rate = 0.0
+    points = 0.0
+    for commodity in commodities:
+        successes, attempts, data_points = stats.get((state, district, market, commodity), (0, 0, 0))
+        rate += (successes + 1) / (attempts + 2)
+        points += data_points / successes if successes else 0.0
+    return rate / len(commodities), points / len(commodities)
+
+def _default_date_range() -> Tuple[str, str]:
+    """
+    Default scrape date range (14 days ago to today), computed once per day.
     
-    # Return markets for the specified state or a default list
-    return state_markets.get(state, [{"district": "Ludhiana", "market": "Ludhiana"}])
+    Returns:
+        Tuple of (date_from, date_to) in Agmarknet's "dd-MMM-yyyy" format
+    """
+    today = date.today()
+    if today not in _DEFAULT_DATE_CACHE:
+        # Start with current year first (or a reasonable year that likely has data)
+        # If we're in a future test environment (2025+), use 2023 data
+        year = today.year if today.year < 2025 else 2023
+        try:
+            end = today.replace(year=year)
+        except ValueError:
+            # 29 February in a year that doesn't have one
+            end = today.replace(year=year, day=28)
+        start = end - timedelta(days=14)
+        
+        _DEFAULT_DATE_CACHE.clear()
+        _DEFAULT_DATE_CACHE[today] = (start.strftime(AGMARKNET_DATE_FORMAT), end.strftime(AGMARKNET_DATE_FORMAT))
+    return _DEFAULT_DATE_CACHE[today]
+
+class AgmarknetUnavailable(ConnectionError):
+    """Raised instead of scraping while scrapes are paused after repeated failures."""
+
+# Failures that say nothing about whether a market has data, only that the
+# site couldn't be reached
+_OUTAGE_ERRORS = (
+    AgmarknetUnavailable, requests.RequestException, ConnectionError,
+    TimeoutError, TimeoutException
+)
+
+def _circuit_check() -> None:
+    """
+    Raise AgmarknetUnavailable while scrapes are paused after repeated failures.
+    """
+    with _circuit_lock:
+        remaining = _circuit["open_until"] - time.monotonic()
+    if remaining > 0:
+        raise AgmarknetUnavailable(f"Agmarknet is failing, not retrying for another {remaining:.0f} seconds")
+
+def _circuit_record(ok: bool) -> None:
+    """
+    Record whether Agmarknet answered a scrape, pausing scrapes once
+    CIRCUIT_FAILURE_THRESHOLD have failed in a row.
+    """
+    with _circuit_lock:
+        if ok:
+            _circuit["failures"] = 0
+            return
+        _circuit["failures"] += 1
+        # The count isn't reset when the circuit opens, so the first failure
+        # after the cooldown pauses scrapes again straight away
+        if _circuit["failures"] >= CIRCUIT_FAILURE_THRESHOLD:
+            _circuit["open_until"] = time.monotonic() + CIRCUIT_COOLDOWN
+
+def _resolve_dates(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, str]:
+    """Fill in the default scrape date range for dates that weren't given."""
+    default_from, default_to = _default_date_range()
+    return (date_from if date_from else default_from, date_to if date_to else default_to)
 
 def scrape_commodity(
     state: str,
@@ -200,10 +1002,13 @@ def scrape_commodity(
     price_arrival: str = "Both",
     date_from: str = None,
     date_to: str = None,
-    debug: bool = False
+    debug: bool = False,
+    max_age_seconds: float = PRICE_CACHE_MAX_AGE,
+    force_fresh: bool = False
 ) -> List[Dict[str, str]]:
     """
     Scrapes commodity price and arrival data from the Agmarknet website.
+    Results are cached on disk, so repeated queries are served locally.
     
     Args:
         state: The state name (e.g., "Himachal Pradesh")
@@ -216,6 +1021,8 @@ def scrape_commodity(
         date_to: End date in format "dd-MMM-yyyy" (e.g., "18-Aug-2023")
                  If not provided, defaults to current date
         debug: If True, enables debug mode with extra logging and screenshots
+        max_age_seconds: Maximum age of cached results to reuse (default 12 hours)
+        force_fresh: If True, skip the cache and always scrape the website
     
     Returns:
         A list of dictionaries containing the scraped data with keys such as:
@@ -229,408 +1036,580 @@ def scrape_commodity(
         - Modal Price
         - Price Date
     """
-    def take_debug_screenshot(name):
-        """Take a screenshot if debug mode is on"""
-        if debug:
-            screenshot_path = os.path.join(DATA_DIR, f"debug_{name}.png")
-            driver.save_screenshot(screenshot_path)
+    date_from_val, date_to_val = _resolve_dates(date_from, date_to)
+    
+    cache_key = _price_cache_key(state, district, market, commodity, price_arrival, date_from_val, date_to_val)
+    if not force_fresh:
+        cached = _price_cache_get(cache_key, max_age_seconds)
+        if cached is not None:
             if debug:
-                print(f"[DEBUG] Screenshot saved as: {screenshot_path}")
-            
+                print(f"[DEBUG] Using cached data for {commodity} in {market}")
+            return cached
+    
     def debug_print(message):
         """Print a message if debug mode is on"""
         if debug:
             print(f"[DEBUG] {message}")
-            
+    
+    def fresh_cached():
+        """Cached records another thread may have fetched meanwhile, or None."""
+        return None if force_fresh else _price_cache_get(cache_key, max_age_seconds)
+    
+    def stale_or_raise(error, cause=None):
+        """Serve an expired copy rather than nothing if the site is failing."""
+        stale = _price_cache_get(cache_key, math.inf)
+        if not stale:
+            if cause is None:
+                raise error
+            raise error from cause
+        debug_print(f"Scrape failed ({error}), using stale cached data for {commodity} in {market}")
+        return stale
+    
+    key_lock = _price_key_lock(cache_key)
+    
+    # Replaying the form over HTTP is much faster than driving a browser, so
+    # try that first. Options missing from the site are a definitive answer;
+    # anything else falls back to the browser.
+    outage = None
+    with key_lock:
+        cached = fresh_cached()
+        if cached is not None:
+            return cached
+        try:
+            _circuit_check()
+            debug_print("Fetching data over HTTP")
+            with _AGMARKNET_SEM:
+                records = _scrape_commodity_http(
+                    state, district, market, commodity, price_arrival,
+                    date_from_val, date_to_val, debug=debug
+                )
+        except ValueError:
+            # The site answered; it just doesn't offer that option
+            _circuit_record(True)
+            raise
+        except AgmarknetUnavailable as e:
+            return stale_or_raise(e)
+        except Exception as e:
+            debug_print(f"HTTP scrape failed, falling back to browser: {e}")
+            if isinstance(e, _OUTAGE_ERRORS):
+                outage = e
+        else:
+            _circuit_record(True)
+            # Empty results are cached too, but expire sooner
+            _price_cache_put(cache_key, records)
+            return records
+    
+    # Key locks are only taken after _BROWSER_SEM, so the key lock is let go
+    # while waiting for a browser and taken again once one is free
+    with _BROWSER_SEM, key_lock:
+        cached = fresh_cached()
+        if cached is not None:
+            return cached
+        try:
+            _circuit_check()
+            driver = _open_driver(debug)
+            try:
+                with _AGMARKNET_SEM:
+                    records = _scrape_commodity_selenium(
+                        driver, state, district, market, commodity,
+                        price_arrival, date_from_val, date_to_val, debug
+                    )
+            finally:
+                driver.quit()
+        except ValueError:
+            _circuit_record(True)
+            raise
+        except Exception as e:
+            if not isinstance(e, AgmarknetUnavailable):
+                _circuit_record(False)
+            # If the site couldn't be reached over HTTP, that is the real problem
+            if outage is None:
+                return stale_or_raise(e)
+            return stale_or_raise(outage, cause=e)
+        
+        _circuit_record(True)
+        _price_cache_put(cache_key, records)
+        return records
+
+def scrape_commodity_batch(
+    state: str,
+    district: str,
+    market: str,
+    commodities: List[str],
+    price_arrival: str = "Both",
+    date_from: str = None,
+    date_to: str = None,
+    debug: bool = False,
+    max_age_seconds: float = PRICE_CACHE_MAX_AGE,
+    force_fresh: bool = False,
+    stop: Optional[threading.Event] = None
+) -> Iterator[Tuple[str, List[Dict[str, str]], Optional[Exception]]]:
+    """
+    Scrapes several commodities from the same market.
+    
+    Cached results are returned first, the rest are fetched over HTTP side by
+    side, and any commodity that still needs the browser is scraped in a
+    single Chrome session instead of starting Chrome once per commodity.
+    
+    Args:
+        commodities: Commodity names to scrape (e.g., ["Rice", "Wheat"])
+        stop: If given, commodities not yet started are skipped once it is set
+        Other arguments are the same as for scrape_commodity
+    
+    Yields:
+        (commodity, records, error) tuples in completion order, where error
+        is the exception raised for that commodity (records is then empty)
+    
+    Only scrapes that completed against the site update the per-market
+    statistics used to rank markets; cache hits, stale copies and failures
+    don't count.
+    """
+    date_from, date_to = _resolve_dates(date_from, date_to)
+    
+    def debug_print(message):
+        """Print a message if debug mode is on"""
+        if debug:
+            print(f"[DEBUG] {message}")
+    
+    def failed(commodity, error):
+        """Returns the (commodity, records, error) to yield for a failed scrape."""
+        # Serve an expired copy rather than nothing if the site is failing
+        stale = None if isinstance(error, ValueError) else _price_cache_get(keys[commodity], math.inf)
+        if not stale:
+            return commodity, [], error
+        debug_print(f"Scrape of {commodity} failed ({error}), using stale cached data")
+        return commodity, stale, None
+    
+    def stopped():
+        """Returns True once the caller no longer wants results"""
+        return stop is not None and stop.is_set()
+    
+    def fetch_http(commodity):
+        """Returns (records, fresh) where fresh is False for cache hits, or
+        (None, False) if the batch was stopped before this one started."""
+        if stopped():
+            return None, False
+        with _price_key_lock(keys[commodity]):
+            # Another thread may have fetched it while we waited for the lock
+            cached = None if force_fresh else _price_cache_get(keys[commodity], max_age_seconds)
+            if cached is not None:
+                return cached, False
+            _circuit_check()
+            with _AGMARKNET_SEM:
+                records = _scrape_commodity_http(
+                    state, district, market, commodity, price_arrival,
+                    date_from, date_to, debug=debug
+                )
+            return records, True
+    
+    keys = {
+        commodity: _price_cache_key(state, district, market, commodity, price_arrival, date_from, date_to)
+        for commodity in commodities
+    }
+    
+    pending = []
+    for commodity in commodities:
+        cached = None if force_fresh else _price_cache_get(keys[commodity], max_age_seconds)
+        if cached is not None:
+            debug_print(f"Using cached data for {commodity} in {market}")
+            yield commodity, cached, None
+        else:
+            pending.append(commodity)
+    
+    needs_browser = []
+    # HTTP outage errors, reported instead of the browser's error if the
+    # browser can't get an answer either
+    outages = {}
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_COMMODITIES, len(pending))) as executor:
+            futures = {executor.submit(fetch_http, commodity): commodity for commodity in pending}
+            for future in as_completed(futures):
+                commodity = futures[future]
+                try:
+                    records, fresh = future.result()
+                except ValueError as e:
+                    _circuit_record(True)
+                    yield commodity, [], e
+                    continue
+                except AgmarknetUnavailable as e:
+                    yield failed(commodity, e)
+                    continue
+                except Exception as e:
+                    debug_print(f"HTTP scrape of {commodity} failed, falling back to browser: {e}")
+                    if isinstance(e, _OUTAGE_ERRORS):
+                        outages[commodity] = e
+                    needs_browser.append(commodity)
+                    continue
+                if records is None:
+                    continue
+                if fresh:
+                    _circuit_record(True)
+                    _price_cache_put(keys[commodity], records)
+                    _record_market_result(state, district, market, commodity, len(records))
+                yield commodity, records, None
+    
+    if not needs_browser or stopped():
+        return
+    
+    driver = None
+    try:
+        for commodity in needs_browser:
+            if stopped():
+                break
+            try:
+                _circuit_check()
+                if driver is None:
+                    _BROWSER_SEM.acquire()
+                    try:
+                        driver = _open_driver(debug)
+                    finally:
+                        if driver is None:
+                            _BROWSER_SEM.release()
+                with _price_key_lock(keys[commodity]), _AGMARKNET_SEM:
+                    records = _scrape_commodity_selenium(
+                        driver, state, district, market, commodity,
+                        price_arrival, date_from, date_to, debug
+                    )
+            except Exception as e:
+                if not isinstance(e, AgmarknetUnavailable):
+                    _circuit_record(isinstance(e, ValueError))
+                if not isinstance(e, ValueError) and commodity in outages:
+                    e = outages[commodity]
+                yield failed(commodity, e)
+                continue
+            _circuit_record(True)
+            _price_cache_put(keys[commodity], records)
+            _record_market_result(state, district, market, commodity, len(records))
+            yield commodity, records, None
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            finally:
+                _BROWSER_SEM.release()
+
+def _wait_options(driver, dropdown_id: str, min_count: int = 2, timeout: float = 10):
+    """
+    Wait until a dropdown has at least min_count options and return its element.
+    The page may be re-rendered by a postback while waiting, so the element
+    is looked up again on every poll.
+    """
+    WebDriverWait(
+        driver, timeout,
+        ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+    ).until(lambda d: len(Select(d.find_element(By.ID, dropdown_id)).options) >= min_count)
+    return driver.find_element(By.ID, dropdown_id)
+
+def _option_texts(driver, element) -> List[str]:
+    """
+    Get the texts of a dropdown's options in one browser round trip, instead
+    of one WebDriver call per option.
+    """
+    return driver.execute_script(
+        "return Array.from(arguments[0].options, function (o) { return o.text.trim(); });",
+        element
+    )
+
+def _wait_postback(driver, element, timeout: float = POSTBACK_START_TIMEOUT) -> bool:
+    """
+    Wait for a postback triggered by changing element to replace the page.
+    Returns False if no postback happened within timeout.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(EC.staleness_of(element))
+        return True
+    except TimeoutException:
+        return False
+
+def _open_driver(debug: bool = False) -> webdriver.Chrome:
+    """Start the Chrome instance used by the Selenium fallback."""
     # Create headless or non-headless browser based on debug setting
     chrome_options = Options()
     if not debug:
         chrome_options.add_argument("--headless")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1920,1080")
+    # Only the form and the results table matter, so skip images and
+    # browser extras and don't wait for every asset to finish loading
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-popup-blocking")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.page_load_strategy = "none"
+    return webdriver.Chrome(options=chrome_options)
+
+def _scrape_commodity_selenium(
+    driver: webdriver.Chrome,
+    state: str,
+    district: str,
+    market: str,
+    commodity: str,
+    price_arrival: str,
+    date_from: str,
+    date_to: str,
+    debug: bool = False
+) -> List[Dict[str, str]]:
+    """
+    Scrape one commodity by driving the Agmarknet form in a browser.
+    The driver is left open so callers can reuse it for further scrapes.
+    
+    Raises:
+        ValueError: If the price type, commodity or state is not offered by the site
+    """
+    def take_debug_screenshot(name):
+        """Take a screenshot if debug mode is on"""
+        if debug:
+            screenshot_path = os.path.join(DATA_DIR, f"debug_{name}.png")
+            driver.save_screenshot(screenshot_path)
+            if debug:
+                print(f"[DEBUG] Screenshot saved as: {screenshot_path}")
             
-    initial_url = "https://agmarknet.gov.in/SearchCmmMkt.aspx"
+    def debug_print(message):
+        """Print a message if debug mode is on"""
+        if debug:
+            print(f"[DEBUG] {message}")
+    
+    initial_url = AGMARKNET_URL
     debug_print(f"Opening {initial_url}")
     
-    driver = webdriver.Chrome(options=chrome_options)
-    try:
-        driver.get(initial_url)
-        take_debug_screenshot("scrape_initial")
+    driver.get(initial_url)
+    # With page_load_strategy "none" get() returns immediately
+    WebDriverWait(driver, 30).until(
+        EC.element_to_be_clickable((By.ID, 'ddlArrivalPrice'))
+    )
+    take_debug_screenshot("scrape_initial")
 
-        # Select Price/Arrivals
+    # Only an option missing from a dropdown is a definitive answer from the
+    # site (ValueError); timeouts and other browser errors propagate as they
+    # are, so they count as failures
+    def select_option(dropdown, text, message):
+        """Select the option with the given text, raising ValueError if there is none"""
         try:
-            debug_print("Selecting price/arrival type: " + price_arrival)
-            dropdown = Select(driver.find_element("id", 'ddlArrivalPrice'))
-            options = [o.text for o in dropdown.options]
-            if debug:
-                print("Available price/arrival options:")
-                for o in options:
-                    print(f"  - {o}")
-            
-            dropdown.select_by_visible_text(price_arrival)
-            time.sleep(2)
-            take_debug_screenshot("after_pricetype")
-        except Exception as e:
-            debug_print(f"Error selecting Price/Arrival type: {e}")
-            driver.quit()
-            raise ValueError(f"Price/Arrival option '{price_arrival}' not found in dropdown.")
+            dropdown.select_by_visible_text(text)
+        except NoSuchElementException:
+            raise ValueError(message) from None
 
-        # Select commodity
-        try:
-            debug_print("Selecting commodity: " + commodity)
-            dropdown = Select(driver.find_element("id", 'ddlCommodity'))
-            options = [o.text for o in dropdown.options]
-            if debug:
-                print("Available commodities (first 10):")
-                for o in options[:10]:
-                    print(f"  - {o}")
-                    
-            dropdown.select_by_visible_text(commodity)
-            time.sleep(2)
-            take_debug_screenshot("after_commodity")
-        except Exception as e:
-            debug_print(f"Error selecting Commodity: {e}")
-            driver.quit()
-            raise ValueError(f"Commodity '{commodity}' not found in dropdown.")
+    # Select Price/Arrivals
+    debug_print("Selecting price/arrival type: " + price_arrival)
+    element = driver.find_element(By.ID, 'ddlArrivalPrice')
+    if debug:
+        options = _option_texts(driver, element)
+        print("Available price/arrival options:")
+        for o in options:
+            print(f"  - {o}")
+    select_option(Select(element), price_arrival, f"Price/Arrival option '{price_arrival}' not found in dropdown.")
+    _wait_postback(driver, element)
+    take_debug_screenshot("after_pricetype")
 
-        # Select state
-        try:
-            debug_print("Selecting state: " + state)
-            dropdown = Select(driver.find_element("id", 'ddlState'))
-            options = [o.text for o in dropdown.options]
-            if debug:
-                print("Available states (first 10):")
-                for o in options[:10]:
-                    print(f"  - {o}")
-            
-            dropdown.select_by_visible_text(state)
-            time.sleep(2)
-            take_debug_screenshot("after_state")
-        except Exception as e:
-            debug_print(f"Error selecting State: {e}")
-            driver.quit()
-            raise ValueError(f"State '{state}' not found in dropdown.")
+    # Select commodity
+    debug_print("Selecting commodity: " + commodity)
+    element = _wait_options(driver, 'ddlCommodity')
+    if debug:
+        options = _option_texts(driver, element)
+        print("Available commodities (first 10):")
+        for o in options[:10]:
+            print(f"  - {o}")
+    select_option(Select(element), commodity, f"Commodity '{commodity}' not found in dropdown.")
+    _wait_postback(driver, element)
+    take_debug_screenshot("after_commodity")
 
-        # Wait for district dropdown to update
-        try:
-            debug_print("Selecting district: " + district)
-            WebDriverWait(driver, 10).until(
-                lambda d: len(Select(d.find_element("id", 'ddlDistrict')).options) > 1
-            )
-            
-            dropdown = Select(driver.find_element("id", 'ddlDistrict'))
-            if debug:
-                print("Waiting for district dropdown to update...")
-                time.sleep(2)  # Extra delay for stability
-                options = [o.text for o in dropdown.options if o.text != "--Select--"]
-                print("Available districts:")
-                for o in options:
-                    print(f"  - {o}")
-            
-            # Try exact match first
-            try:
-                dropdown.select_by_visible_text(district)
-            except Exception as e:
-                debug_print(f"Exact match failed for district: {e}")
-                
-                # Try case-insensitive match
-                options = [o.text for o in dropdown.options if o.text != "--Select--"]
-                match_found = False
-                
-                for option_text in options:
-                    if district.lower() == option_text.lower() or district.lower() in option_text.lower():
-                        debug_print(f"Found close match for district: '{option_text}' for '{district}'")
-                        dropdown.select_by_visible_text(option_text)
-                        district = option_text  # Update the district name
-                        match_found = True
-                        break
-                        
-                if not match_found:
-                    # If no match, select the first valid option
-                    if len(options) > 0:
-                        first_option = options[0]
-                        debug_print(f"No match found for district '{district}', using first available: {first_option}")
-                        dropdown.select_by_visible_text(first_option)
-                        district = first_option  # Update the district name
-                    else:
-                        raise ValueError(f"No valid district options available")
-                
-            time.sleep(3)  # Extended wait time to ensure market dropdown updates
-            take_debug_screenshot("after_district")
-        except Exception as e:
-            debug_print(f"Error selecting District: {e}")
-            driver.quit()
-            raise ValueError(f"District '{district}' not found in dropdown after waiting: {str(e)}")
+    # Select state
+    debug_print("Selecting state: " + state)
+    element = _wait_options(driver, 'ddlState')
+    if debug:
+        options = _option_texts(driver, element)
+        print("Available states (first 10):")
+        for o in options[:10]:
+            print(f"  - {o}")
+    select_option(Select(element), state, f"State '{state}' not found in dropdown.")
+    take_debug_screenshot("after_state")
 
-        # Select market with flexible matching
-        try:
-            debug_print("Selecting market: " + market)
-            WebDriverWait(driver, 10).until(
-                lambda d: len(Select(d.find_element("id", 'ddlMarket')).options) > 1
-            )
-            
-            dropdown = Select(driver.find_element("id", 'ddlMarket'))
-            if debug:
-                print("Waiting for market dropdown to update...")
-                time.sleep(2)  # Extra delay for stability
-                options = [o.text for o in dropdown.options if o.text != "--Select--"]
-                print("Available markets:")
-                for o in options:
-                    print(f"  - {o}")
-                    
-            # Filter out "--Select--" option
-            market_options = [option.text for option in dropdown.options if option.text != "--Select--"]
-            
-            if not market_options:
-                debug_print(f"No valid market options available for district {district}")
-                raise ValueError(f"No valid market options available for district {district}")
-                
-            # Try exact match first
-            try:
-                dropdown.select_by_visible_text(market)
-                debug_print("Selected market (exact match)")
-            except:
-                # If exact match fails, try a more flexible approach
-                # Try to find a close match ignoring case
-                match_found = False
-                for option_text in market_options:
-                    if market.lower() == option_text.lower() or market.lower() in option_text.lower():
-                        debug_print(f"Found close match: '{option_text}' for '{market}'")
-                        dropdown.select_by_visible_text(option_text)
-                        match_found = True
-                        break
-                        
-                if not match_found:
-                    # Use the first available market as fallback
-                    first_market = market_options[0]
-                    dropdown.select_by_visible_text(first_market)
-                    debug_print(f"No match found for market '{market}', using first available: {first_market}")
-                    market = first_market  # Update the market name
-                        
-            time.sleep(2)
-            take_debug_screenshot("after_market")
-        except Exception as e:
-            debug_print(f"Error selecting Market: {e}")
-            driver.quit()
-            raise ValueError(f"Market selection failed: {str(e)}")
+    # Wait for district dropdown to update
+    debug_print("Selecting district: " + district)
+    element = _wait_options(driver, 'ddlDistrict')
+    options = [o for o in _option_texts(driver, element) if o != "--Select--"]
+    if debug:
+        print("Available districts:")
+        for o in options:
+            print(f"  - {o}")
+    
+    if not options:
+        raise RuntimeError("No valid district options available")
+    
+    choice = _closest_option(options, district)
+    if choice != district:
+        debug_print(f"No exact match for district '{district}', using '{choice}'")
+    Select(element).select_by_visible_text(choice)
+    district = choice  # Update the district name
+    
+    _wait_postback(driver, element)
+    take_debug_screenshot("after_district")
 
-        # Set Date From and Date To
-        today = datetime.now()
-        # Use a safer date range format that the website accepts (14 days ago to today)
-        # Agmarknet uses a specific format with abbreviated month name
-        default_from = (today - timedelta(days=14)).strftime('%d-%b-%Y')
-        default_to = today.strftime('%d-%b-%Y')
-        
-        # Start with current year first (or a reasonable year that likely has data)
-        # If we're in a future test environment (2025+), use 2023 data
-        if today.year >= 2025:
-            default_from = default_from.replace(str(today.year), "2023")
-            default_to = default_to.replace(str(today.year), "2023")
+    # Select market with flexible matching
+    debug_print("Selecting market: " + market)
+    element = _wait_options(driver, 'ddlMarket')
+    # Filter out "--Select--" option
+    market_options = [o for o in _option_texts(driver, element) if o != "--Select--"]
+    if debug:
+        print("Available markets:")
+        for o in market_options:
+            print(f"  - {o}")
+    
+    if not market_options:
+        debug_print(f"No valid market options available for district {district}")
+        raise RuntimeError(f"No valid market options available for district {district}")
+    
+    choice = _closest_option(market_options, market)
+    if choice != market:
+        debug_print(f"No exact match for market '{market}', using '{choice}'")
+    Select(element).select_by_visible_text(choice)
+    market = choice  # Update the market name
+    
+    _wait_postback(driver, element)
+    take_debug_screenshot("after_market")
+
+    # Set Date From and Date To
+    try:
+        debug_print(f"Setting date range from {date_from} to {date_to}")
         
-        date_from_val = date_from if date_from else default_from
-        date_to_val = date_to if date_to else default_to
+        # Assign each date in one go and fire the events the page's
+        # validators listen for, instead of typing it key by key
+        for field_id, value in (("txtDate", date_from), ("txtDateTo", date_to)):
+            date_input = driver.find_element(By.ID, field_id)
+            driver.execute_script(SET_INPUT_VALUE_JS, date_input, value)
         
+        take_debug_screenshot("after_dates")
+    except Exception as e:
+        debug_print(f"Error setting dates: {e}")
+        raise RuntimeError(f"Date input fields not found. Error: {str(e)}")
+
+    # Click Go button with retry mechanism for common click intercept issues
+    max_retries = 5
+    for retry in range(max_retries):
         try:
-            debug_print(f"Setting date range from {date_from_val} to {date_to_val}")
+            debug_print("Clicking Go button")
+            button = driver.find_element("id", 'btnGo')
             
-            # Clear and set the from date with more robust approach
-            date_input_from = driver.find_element(By.ID, "txtDate")
-            date_input_from.clear()
-            time.sleep(1)  # Give time for field to clear
-            # Send date character by character with brief pauses
-            for char in date_from_val:
-                date_input_from.send_keys(char)
-                time.sleep(0.1)
-            time.sleep(1)
+            # Try to scroll the button into view
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
             
-            # Clear and set the to date with more robust approach
-            date_input_to = driver.find_element(By.ID, "txtDateTo")
-            date_input_to.clear()
-            time.sleep(1)  # Give time for field to clear
-            # Send date character by character with brief pauses
-            for char in date_to_val:
-                date_input_to.send_keys(char)
-                time.sleep(0.1)
-            time.sleep(2)
-            
-            take_debug_screenshot("after_dates")
+            # First try: JavaScript click which can bypass some intercepted click issues
+            driver.execute_script("arguments[0].click();", button)
+            debug_print("Go button clicked (using JS)")
+            take_debug_screenshot("after_go")
+            break
         except Exception as e:
-            debug_print(f"Error setting dates: {e}")
-            driver.quit()
-            raise RuntimeError(f"Date input fields not found. Error: {str(e)}")
-
-        # Click Go button with retry mechanism for common click intercept issues
-        max_retries = 5
-        for retry in range(max_retries):
+            debug_print(f"Error clicking Go button (attempt {retry+1} with JS): {e}")
+            
             try:
-                debug_print("Clicking Go button")
-                button = driver.find_element("id", 'btnGo')
-                
-                # Try to scroll the button into view
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
-                time.sleep(1)
+                # Second approach: Try to handle any validation errors
+                # Look for and dismiss any validation messages
+                try:
+                    error_messages = driver.find_elements(By.CSS_SELECTOR, "div.ajax__validatorcallout")
+                    if error_messages:
+                        debug_print(f"Found {len(error_messages)} validation errors, attempting to dismiss")
+                        for msg in error_messages:
+                            try:
+                                # Try to click the close button on each error
+                                close_btn = msg.find_element(By.CSS_SELECTOR, "div.ajax__validatorcallout_close_button_cell")
+                                driver.execute_script("arguments[0].click();", close_btn)
+                            except:
+                                pass
+                except:
+                    pass
                 
-                # First try: JavaScript click which can bypass some intercepted click issues
-                driver.execute_script("arguments[0].click();", button)
-                debug_print("Go button clicked (using JS)")
-                time.sleep(3)
-                take_debug_screenshot("after_go")
+                # Try clicking with Actions (another way to bypass intercepts)
+                from selenium.webdriver.common.action_chains import ActionChains
+                actions = ActionChains(driver)
+                actions.move_to_element(button).click().perform()
+                debug_print("Go button clicked (using Actions)")
+                take_debug_screenshot("after_go_actions")
                 break
-            except Exception as e:
-                debug_print(f"Error clicking Go button (attempt {retry+1} with JS): {e}")
+            except Exception as e2:
+                debug_print(f"Error clicking Go button (attempt {retry+1} with Actions): {e2}")
                 
+            if retry == max_retries - 1:
+                # On last retry, try a desperate approach - direct form submission
                 try:
-                    # Second approach: Try to handle any validation errors
-                    # Look for and dismiss any validation messages
-                    try:
-                        error_messages = driver.find_elements(By.CSS_SELECTOR, "div.ajax__validatorcallout")
-                        if error_messages:
-                            debug_print(f"Found {len(error_messages)} validation errors, attempting to dismiss")
-                            for msg in error_messages:
-                                try:
-                                    # Try to click the close button on each error
-                                    close_btn = msg.find_element(By.CSS_SELECTOR, "div.ajax__validatorcallout_close_button_cell")
-                                    driver.execute_script("arguments[0].click();", close_btn)
-                                except:
-                                    pass
-                    except:
-                        pass
-                    
-                    # Try clicking with Actions (another way to bypass intercepts)
-                    from selenium.webdriver.common.action_chains import ActionChains
-                    actions = ActionChains(driver)
-                    actions.move_to_element(button).click().perform()
-                    debug_print("Go button clicked (using Actions)")
-                    time.sleep(3)
-                    take_debug_screenshot("after_go_actions")
+                    driver.execute_script("document.forms[0].submit();")
+                    debug_print("Attempted form submission directly")
+                    take_debug_screenshot("after_form_submit")
                     break
-                except Exception as e2:
-                    debug_print(f"Error clicking Go button (attempt {retry+1} with Actions): {e2}")
+                except Exception as e3:
+                    debug_print(f"Error submitting form: {e3}")
+                    # On last retry, take screenshot and raise error
+                    take_debug_screenshot("error_button")
+                    raise RuntimeError(f"Go button click failed after {max_retries} attempts: {str(e)}")
                     
-                if retry == max_retries - 1:
-                    # On last retry, try a desperate approach - direct form submission
-                    try:
-                        driver.execute_script("document.forms[0].submit();")
-                        debug_print("Attempted form submission directly")
-                        time.sleep(3)
-                        take_debug_screenshot("after_form_submit")
-                        break
-                    except Exception as e3:
-                        debug_print(f"Error submitting form: {e3}")
-                        # On last retry, take screenshot and raise error
-                        take_debug_screenshot("error_button")
-                        driver.quit()
-                        raise RuntimeError(f"Go button click failed after {max_retries} attempts: {str(e)}")
-                        
-                time.sleep(2)  # Wait before retry
-
-        # Wait for the table to be present
-        debug_print("Waiting for results table...")
+            time.sleep(2)  # Wait before retry
+
+    # Wait for the table to be present
+    debug_print("Waiting for results table...")
+    try:
+        # Try different table IDs
+        table_ids = RESULT_TABLE_IDS
+        table_element = None
+        
+        # First try with explicit IDs, waiting for whichever renders
         try:
-            # Try different table IDs
-            table_ids = ['cphBody_GridViewBoth', 'cphBody_GridPriceData', 'cphBody_GridArrivalData']
-            table_found = False
-            table_id = None
-            
-            # First try with explicit IDs
-            for tid in table_ids:
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.ID, tid))
-                    )
-                    table_found = True
-                    table_id = tid
-                    debug_print(f"Table found with ID: {tid}")
-                    break
-                except:
-                    continue
-            
-            # If no table found by ID, try to find any table with results data
-            if not table_found:
-                debug_print("No table found by ID, searching for table with results data...")
-                try:
-                    # Look for table header with expected column names
-                    header_xpath = "//table//tr/th[contains(text(), 'State Name') or contains(text(), 'Market Name')]"
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, header_xpath))
-                    )
-                    
-                    # Find the containing table
-                    table_element = driver.find_element(By.XPATH, "//table[.//th[contains(text(), 'State Name')]]")
-                    if table_element:
-                        table_found = True
-                        table_id = table_element.get_attribute("id")
-                        if not table_id:
-                            # Use a generic identifier if no ID is available
-                            table_id = "results_table"
-                        debug_print(f"Table found by content search, using ID: {table_id}")
-                except:
-                    debug_print("No results table found by content search")
-            
-            if not table_found:
-                debug_print("No data table found on the page")
-                take_debug_screenshot("table_not_found")
-                raise RuntimeError("No data table found on the page")
-                
-            # Process table data
-            debug_print("Table found! Processing data...")
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            # If we have a specific table ID, try to find it
-            if table_id != "results_table":
-                table = soup.find('table', id=table_id)
-            else:
-                # If we're using the generic ID, find by content
-                debug_print("Finding table by content...")
-                # Look for table with the characteristic header
-                tables = soup.find_all('table')
-                table = None
-                for t in tables:
-                    headers = t.find_all('th')
-                    header_texts = [h.get_text().strip() for h in headers]
-                    if any('State Name' in h for h in header_texts) or any('Market Name' in h for h in header_texts):
-                        table = t
-                        debug_print("Table found by content search")
-                        break
-            
-            if not table:
-                debug_print(f"Table with data not found in the page source")
-                raise RuntimeError(f"Table with data not found in the page source")
-                
-            jsonList = []
-            
-            # Extract table headers
-            headers = []
-            header_row = table.find('tr')
-            if header_row:
-                headers = [th.get_text().strip() for th in header_row.find_all('th')]
+            table_id = WebDriverWait(driver, 30).until(
+                lambda d: next((tid for tid in table_ids if d.find_elements(By.ID, tid)), False)
+            )
+            table_element = driver.find_element(By.ID, table_id)
+            debug_print(f"Table found with ID: {table_id}")
+        except TimeoutException:
+            pass
+        
+        # If no table found by ID, try to find any table with results data
+        if table_element is None:
+            debug_print("No table found by ID, searching for table with results data...")
+            try:
+                # Look for table header with expected column names
+                header_xpath = "//table//tr/th[contains(text(), 'State Name') or contains(text(), 'Market Name')]"
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.XPATH, header_xpath))
+                )
                 
-            # Process data rows (skip header row and summary rows)
-            for row in table.find_all('tr')[1:]:  # Skip header row
-                # Skip summary rows (they have a different background color)
-                if 'background-color:#F9F9F9' in str(row):
-                    continue
-                    
-                cells = row.find_all('td')
-                if cells:
-                    # Use the actual headers from the table for the keys
-                    data = {}
-                    for i, header in enumerate(headers):
-                        if i < len(cells):
-                            # Clean up header name for use as a key
-                            clean_header = header.split('(')[0].strip()  # Remove units in parentheses
-                            data[clean_header] = cells[i].get_text().strip()
-                    jsonList.append(data)
-            
-            debug_print(f"Processed {len(jsonList)} records.")
-            return jsonList
+                # Find the containing table
+                table_element = driver.find_element(
+                    By.XPATH, "//table[.//th[contains(text(), 'State Name') or contains(text(), 'Market Name')]]"
+                )
+                debug_print("Table found by content search")
+            except:
+                debug_print("No results table found by content search")
+        
+        if table_element is None:
+            debug_print("No data table found on the page")
+            take_debug_screenshot("table_not_found")
+            raise RuntimeError("No data table found on the page")
             
-        except Exception as e:
-            debug_print(f"Error processing table data: {e}")
-            take_debug_screenshot("error_processing")
-            raise RuntimeError(f"Error processing table data: {str(e)}")
-    finally:
-        driver.quit()
+        # Stop any trailing asset fetches now that the data is here
+        driver.execute_script("window.stop();")
+        
+        # Process table data. Only the table's own HTML is pulled out of the
+        # browser rather than serializing the whole page.
+        debug_print("Table found! Processing data...")
+        jsonList = _parse_table_html(table_element.get_attribute('outerHTML'))
+        
+        debug_print(f"Processed {len(jsonList)} records.")
+        return jsonList
+        
+    except Exception as e:
+        debug_print(f"Error processing table data: {e}")
+        take_debug_screenshot("error_processing")
+        raise RuntimeError(f"Error processing table data: {str(e)}")
+
+def _price_date(item: Dict[str, str]) -> datetime:
+    """Parse a record's price date, treating unparseable dates as oldest."""
+    try:
+        return datetime.strptime(
+            item.get('Price Date') or item.get('Reported Date') or '01 Jan 2000',
+            PRICE_DATE_FORMAT
+        )
+    except ValueError:
+        return datetime.min
 
 def get_latest_prices(data: List[Dict[str, str]], commodity_variety: Optional[str] = None) -> Dict[str, Union[str, float]]:
     """
@@ -662,22 +1641,9 @@ def get_latest_prices(data: List[Dict[str, str]], commodity_variety: Optional[st
     if not filtered_data:
         return {}
     
-    # Sort by date (most recent first)
-    try:
-        # Try to handle different date formats
-        sorted_data = sorted(
-            filtered_data, 
-            key=lambda x: datetime.strptime(
-                x.get('Price Date', x.get('Reported Date', '01 Jan 2000')), 
-                '%d %b %Y'
-            ),
-            reverse=True
-        )
-    except ValueError:
-        # If date parsing fails, just use the first entry
-        sorted_data = filtered_data
-    
-    latest = sorted_data[0]
+    # Only the most recent entry is needed, so parse each date once and take
+    # the max; the first entry wins ties, as it did with a stable sort
+    latest = max(filtered_data, key=_price_date)
     
     # Return formatted result
     return {
@@ -702,25 +1668,23 @@ def get_commodity_prices(lat: float, lon: float, commodities: List[str], debug:
     Returns:
         Dictionary mapping commodity names to their price data results
     """
-    results = {}
-    
-    for commodity in commodities:
-        try:
-            result = get_commodity_price(lat, lon, commodity, debug=debug)
-            results[commodity] = result
-        except Exception as e:
-            # Handle exceptions for individual commodities but continue with others
-            results[commodity] = {
-                "error": f"Error retrieving data for {commodity}: {str(e)}",
-                # Add seasonal info if available
-                "seasonal_info": {
-                    "growing_season": "Data not available",
-                    "harvesting_period": "Data not available",
-                    "expected_next_harvest": "Data not available"
-                }
-            }
+    if not commodities:
+        return {}
     
-    return results
+    try:
+        return _lookup_commodity_prices(lat, lon, commodities, debug=debug)
+    except Exception as e:
+        return {commodity: _error_result(commodity, str(e)) for commodity in commodities}
+
+def _error_result(commodity: str, message: str) -> Dict[str, Any]:
+    """
+    Build the result returned for a commodity whose lookup failed outright.
+    """
+    return {
+        "error": f"Error retrieving data for {commodity}: {message}",
+        # Copy so callers can't modify the shared table
+        "seasonal_info": dict(_UNAVAILABLE_SEASONS)
+    }
 
 def get_commodity_price(lat: float, lon: float, commodity: str, debug: bool = False) -> Dict[str, Any]:
     """
@@ -741,12 +1705,24 @@ def get_commodity_price(lat: float, lon: float, commodity: str, debug: bool = Fa
         - latest_prices: Dictionary with price info (min_price, max_price, modal_price, date, variety)
         - error: Error message if any occurred (only present if an error occurred)
     """
-    result = {
-        "state": None,
-        "district": None,
-        "market": None,
-        "latest_prices": {},
-        "data_points": 0
+    return _lookup_commodity_prices(lat, lon, [commodity], debug=debug)[commodity]
+
+def _lookup_commodity_prices(lat: float, lon: float, commodities: List[str], debug: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Look up several commodities at once, in the format of get_commodity_price.
+    
+    Markets are tried in the same order as for a single commodity, but each
+    market is scraped for all commodities still without data in one batch.
+    """
+    results = {
+        commodity: {
+            "state": None,
+            "district": None,
+            "market": None,
+            "latest_prices": {},
+            "data_points": 0
+        }
+        for commodity in commodities
     }
     
     try:
@@ -758,8 +1734,9 @@ def get_commodity_price(lat: float, lon: float, commodity: str, debug: bool = Fa
         if debug:
             print(f"Found nearest location: {district}, {state} ({location_info['distance']:.2f} km)")
         
-        result["state"] = state
-        result["district"] = district
+        for result in results.values():
+            result["state"] = state
+            result["district"] = district
         
         # Step 2: Get potential markets for the district
         markets = get_markets_in_district(state, district)
@@ -769,108 +1746,145 @@ def get_commodity_price(lat: float, lon: float, commodity: str, debug: bool = Fa
                 print(f"No markets found for {district}, {state}. Using default markets.")
             markets = ["Ludhiana"]
         
-        # Step 3: Try to get data for each market until we find one with results
-        market_data = []
-        successful_market = None
+        # Step 3: Try each market in the district, then alternate markets in
+        # the state (skipping ones already tried), until every commodity has data.
+        # Within each tier, markets that have had data for these commodities
+        # before go first; the sort is stable, so otherwise the order is kept.
+        # The district's own markets always come before the alternates.
+        wanted = list(dict.fromkeys(commodities))
+        
+        def by_score(tier):
+            return sorted(
+                tier,
+                key=lambda candidate: _market_score(state, candidate[0], candidate[1], wanted),
+                reverse=True
+            )
+        
+        candidates = by_score([(district, market) for market in markets])
+        candidates += by_score([
+            (market_info["district"], market_info["market"])
+            for market_info in get_alternate_markets(state)
+            if not (market_info["district"] == district and market_info["market"] in markets)
+        ])
         
         # Set date range (2 weeks ago to today)
         today = datetime.now()
         two_weeks_ago = today - timedelta(days=14)
-        date_from = two_weeks_ago.strftime('%d-%b-%Y')
-        date_to = today.strftime('%d-%b-%Y')
+        date_from = two_weeks_ago.strftime(AGMARKNET_DATE_FORMAT)
+        date_to = today.strftime(AGMARKNET_DATE_FORMAT)
         
-        # Try each market in the district
-        for market in markets:
-            try:
-                if debug:
-                    print(f"Trying to get data for {commodity} from {market} market in {district}, {state}")
-                
-                market_data = scrape_commodity(
-                    state=state,
-                    district=district,
-                    market=market,
-                    commodity=commodity,
-                    price_arrival="Both",
-                    date_from=date_from,
-                    date_to=date_to,
-                    debug=debug
-                )
-                
-                if market_data and len(market_data) > 0:
-                    successful_market = market
-                    if debug:
-                        print(f"Successfully found data in {market} market")
+        def scrape_market(market_district, market, wanted, stop):
+            if debug:
+                print(f"Trying to get data for {', '.join(wanted)} from {market} market in {market_district}, {state}")
+            batch = scrape_commodity_batch(
+                state=state,
+                district=market_district,
+                market=market,
+                commodities=wanted,
+                price_arrival="Both",
+                date_from=date_from,
+                date_to=date_to,
+                debug=debug,
+                stop=stop
+            )
+            found = {}
+            errors = {}
+            for commodity, market_data, error in batch:
+                if stop.is_set():
+                    batch.close()
                     break
-            except Exception as e:
-                if debug:
-                    print(f"Error getting data from {market} market: {str(e)}")
-                continue
+                if error is not None:
+                    errors[commodity] = error
+                    if debug:
+                        print(f"Error getting data for {commodity} from {market} market: {str(error)}")
+                elif market_data:
+                    found[commodity] = market_data
+            return found, errors
         
-        # If still no data, try alternate markets in the state
-        if not market_data or len(market_data) == 0:
-            if debug:
-                print(f"No data found in any market in {district}. Trying alternate markets in {state}.")
-            
-            alternate_markets = get_alternate_markets(state)
+        # Markets are tried MARKET_FANOUT at a time so a run of markets without
+        # data costs one round trip instead of one each. Within a window the
+        # earliest market with data still wins, as if they were tried in order.
+        remaining = wanted
+        # Commodities every market answered for (with or without data), and
+        # the last outage error for the rest
+        answered = set()
+        outage = {}
+        for start in range(0, len(candidates), MARKET_FANOUT):
+            if not remaining:
+                break
+            window = candidates[start:start + MARKET_FANOUT]
+            best = {}  # commodity -> (rank, district, market, data)
             
-            for market_info in alternate_markets:
-                alt_district = market_info["district"]
-                alt_market = market_info["market"]
-                
-                # Skip if we already tried this market
-                if alt_district == district and alt_market in markets:
-                    continue
-                
-                try:
-                    if debug:
-                        print(f"Trying alternate market: {alt_market} in {alt_district}, {state}")
+            stop = threading.Event()
+            executor = ThreadPoolExecutor(max_workers=len(window))
+            futures = {
+                executor.submit(scrape_market, market_district, market, remaining, stop): rank
+                for rank, (market_district, market) in enumerate(window)
+            }
+            pending = set(futures)
+            try:
+                for future in as_completed(futures):
+                    pending.discard(future)
+                    rank = futures[future]
+                    market_district, market = window[rank]
+                    found, errors = future.result()
+                    for commodity in remaining:
+                        error = errors.get(commodity)
+                        if isinstance(error, _OUTAGE_ERRORS):
+                            outage[commodity] = error
+                        else:
+                            answered.add(commodity)
+                    for commodity, market_data in found.items():
+                        if commodity not in best or rank < best[commodity][0]:
+                            best[commodity] = (rank, market_district, market, market_data)
                     
-                    market_data = scrape_commodity(
-                        state=state,
-                        district=alt_district,
-                        market=alt_market,
-                        commodity=commodity,
-                        price_arrival="Both",
-                        date_from=date_from,
-                        date_to=date_to,
-                        debug=debug
+                    # Stop once no outstanding market could beat what we have
+                    worst_best = max(
+                        best[commodity][0] if commodity in best else len(window)
+                        for commodity in remaining
                     )
-                    
-                    if market_data and len(market_data) > 0:
-                        successful_market = alt_market
-                        district = alt_district  # Update district to match the market
-                        result["district"] = district
-                        if debug:
-                            print(f"Successfully found data in alternate market {alt_market}")
+                    if all(futures[f] > worst_best for f in pending):
                         break
-                except Exception as e:
-                    if debug:
-                        print(f"Error getting data from alternate market {alt_market}: {str(e)}")
-                    continue
-        
-        # Step 4: Process the results
-        if successful_market and market_data:
-            result["market"] = successful_market
-            result["data_points"] = len(market_data)
-            latest_prices = get_latest_prices(market_data)
-            result["latest_prices"] = latest_prices
+            finally:
+                # Markets that can no longer win finish the commodity they are
+                # on (which still fills the price cache) and skip the rest
+                stop.set()
+                executor.shutdown(wait=False, cancel_futures=True)
             
+            # Step 4: Process the results
+            for commodity, (_, market_district, market, market_data) in best.items():
+                result = results[commodity]
+                result["district"] = market_district  # Update district to match the market
+                result["market"] = market
+                result["data_points"] = len(market_data)
+                latest_prices = get_latest_prices(market_data)
+                result["latest_prices"] = latest_prices
+                
+                if debug:
+                    print(f"Successfully found price data for {commodity} in {market}, {state}")
+                    print(f"Latest price: ₹{latest_prices.get('modal_price')} (₹{latest_prices.get('min_price')} - ₹{latest_prices.get('max_price')})")
+                    print(f"Variety: {latest_prices.get('variety')}")
+                    print(f"Date: {latest_prices.get('date')}")
+            
+            remaining = [commodity for commodity in remaining if results[commodity]["market"] is None]
+        
+        for commodity in remaining:
+            if commodity in outage and commodity not in answered:
+                # No market could be reached, so we don't know there's no data
+                results[commodity]["error"] = f"Agmarknet is unavailable: {outage[commodity]}"
+            else:
+                results[commodity]["error"] = f"No price data found for {commodity} in any market in {state}"
             if debug:
-                print(f"Successfully found price data for {commodity} in {successful_market}, {state}")
-                print(f"Latest price: ₹{latest_prices.get('modal_price')} (₹{latest_prices.get('min_price')} - ₹{latest_prices.get('max_price')})")
-                print(f"Variety: {latest_prices.get('variety')}")
-                print(f"Date: {latest_prices.get('date')}")
-        else:
-            result["error"] = f"No price data found for {commodity} in any market in {state}"
-            if debug:
-                print(result["error"])
+                print(results[commodity]["error"])
     
     except Exception as e:
-        result["error"] = str(e)
+        for commodity, result in results.items():
+            if result["market"] is None:
+                result["error"] = str(e)
         if debug:
             print(f"Error in get_commodity_price: {str(e)}")
     
-    return result
+    return results
 
 def get_crop_seasons(commodity: str) -> Dict[str, str]:
     """
@@ -882,52 +1896,8 @@ def get_crop_seasons(commodity: str) -> Dict[str, str]:
     Returns:
         Dictionary with seasonal information
     """
-    # Common crop seasons in India
-    CROP_SEASONS = {
-        "rice": {
-            "growing_season": "Kharif (June-July to October-November)",
-            "harvesting_period": "September-December",
-            "expected_next_harvest": "October-November"
-        },
-        "wheat": {
-            "growing_season": "Rabi (October-December to March-April)",
-            "harvesting_period": "February-May", 
-            "expected_next_harvest": "March-April"
-        },
-        "maize": {
-            "growing_season": "Both Kharif and Rabi seasons",
-            "harvesting_period": "September-October (Kharif), February-March (Rabi)",
-            "expected_next_harvest": "Varies by region"
-        },
-        "potato": {
-            "growing_season": "Rabi (October-November to February-March)",
-            "harvesting_period": "January-March",
-            "expected_next_harvest": "January-February"
-        },
-        "onion": {
-            "growing_season": "Kharif, late Kharif, and Rabi",
-            "harvesting_period": "Year-round in different regions",
-            "expected_next_harvest": "Varies by region"
-        },
-        "tomato": {
-            "growing_season": "Year-round in different regions",
-            "harvesting_period": "Varies by region",
-            "expected_next_harvest": "Varies by region"
-        },
-        "apple": {
-            "growing_season": "Spring (March-April)",
-            "harvesting_period": "July-October",
-            "expected_next_harvest": "August-September"
-        },
-        "strawberry": {
-            "growing_season": "October-November",
-            "harvesting_period": "January-March",
-            "expected_next_harvest": "January-February"
-        }
-        # Add more crops as needed
-    }
-    
-    return CROP_SEASONS.get(commodity.lower(), {})
+    # Copy so callers can't modify the shared table
+    return dict(CROP_SEASONS.get(commodity.lower(), {}))
 
 def get_all_commodity_prices(lat: float, lon: float, commodities: List[str], debug: bool = False) -> Dict[str, Dict[str, Any]]:
     """
@@ -949,25 +1919,23 @@ def get_all_commodity_prices(lat: float, lon: float, commodities: List[str], deb
     if not commodities:
         commodities = ["Rice", "Wheat"]
     
+    if debug:
+        print(f"Getting price data for {', '.join(commodities)} at coordinates {lat}, {lon}")
+    
+    # Look up all commodities together; scrapes for different commodities run
+    # concurrently instead of one after another
+    prices = get_commodity_prices(lat, lon, commodities, debug=debug)
+    
     # Process each commodity
     for commodity in commodities:
-        try:
-            if debug:
-                print(f"Getting price data for {commodity} at coordinates {lat}, {lon}")
-                
-            commodity_data = get_commodity_price(lat, lon, commodity, debug=debug)
+        commodity_data = prices[commodity]
+        
+        # Add seasonal information if available
+        seasons = get_crop_seasons(commodity)
+        if seasons:
+            commodity_data["seasonal_info"] = seasons
             
-            # Add seasonal information if available
-            seasons = get_crop_seasons(commodity)
-            if seasons:
-                commodity_data["seasonal_info"] = seasons
-                
-            result[commodity] = commodity_data
-        except Exception as e:
-            result[commodity] = {
-                "error": str(e),
-                "seasonal_info": get_crop_seasons(commodity)  # Add seasonal info even if price lookup fails
-            }
+        result[commodity] = commodity_data
     
     return result
 
@@ -8,17 +8,119 @@ geographical coordinates, and to find the nearest market to a given location.
 import requests
 import math
 import json
-from typing import Tuple, Optional, Dict, List, Any
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from functools import lru_cache
+from typing import Tuple, Optional, Dict, List, Any, NamedTuple
 from pathlib import Path
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Try to import geopy for distance calculation, but provide fallback if not available
+try:
+    from geopy.distance import geodesic
+    HAS_GEOPY = True
+except ImportError:
+    HAS_GEOPY = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
 
 # We'll use OpenStreetMap's Nominatim API for reverse geocoding
 # It's free and doesn't require an API key, but has usage limits
 NOMINATIM_API = "https://nominatim.openstreetmap.org/reverse"
+NOMINATIM_TIMEOUT = (5, 15)  # (connect, read) seconds
+NOMINATIM_HEADERS = {
+    "User-Agent": "Farmora/1.0 (farmora.app; contact@farmora.app)"
+}
+
+# Reverse geocoding lookups are cached for points rounded to this many
+# decimal places (~100 m), well below the district-level zoom we ask for
+NOMINATIM_CACHE_DECIMALS = 3
+
+# One keep-alive connection pool for every Nominatim request. Rate limiting
+# (429) and gateway errors are retried with backoff, honouring Retry-After.
+_nominatim_session = requests.Session()
+_nominatim_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=(429, 502, 503, 504))
+))
+_nominatim_session.headers.update(NOMINATIM_HEADERS)
 
 # Define paths to data files
 DATA_DIR = Path(__file__).parent.parent / "data"
 MARKETS_FILE = DATA_DIR / "geocoded_markets.json"
 
+# Reverse geocoding results are also kept on disk, so they survive restarts
+GEOCODE_CACHE_FILE = DATA_DIR / "geocode_cache.db"
+GEOCODE_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # seconds
+
+# Earth's radius in kilometers
+EARTH_RADIUS_KM = 6371.0
+
+# Haversine and geodesic distances differ by well under 1%, so with geopy any
+# market within this factor of the haversine minimum is re-ranked exactly
+GEODESIC_RECHECK_FACTOR = 1.02
+
+class _MarketIndex(NamedTuple):
+    """Every market with valid coordinates, flattened into parallel arrays."""
+    lats: np.ndarray  # degrees
+    lons: np.ndarray  # degrees
+    lat_rad: np.ndarray
+    lon_rad: np.ndarray
+    cos_lat: np.ndarray
+    meta: List[Tuple[str, str, str]]  # (state, district, market) per row
+    districts: Dict[str, Dict[str, range]]  # state -> district -> rows
+    state_names: Dict[str, str]  # lowercase state -> state
+    district_names: Dict[str, Dict[str, str]]  # state -> lowercase district -> district
+    tree: Optional["cKDTree"]  # over unit-sphere coordinates, None without scipy
+
+def _unit_xyz(lats, lons) -> np.ndarray:
+    """Convert degrees latitude/longitude to 3D points on the unit sphere."""
+    phi = np.radians(lats)
+    theta = np.radians(lons)
+    return np.stack([np.cos(phi) * np.cos(theta), np.cos(phi) * np.sin(theta), np.sin(phi)], axis=-1)
+
+def _market_coordinates(coords: Any) -> Optional[Tuple[float, float]]:
+    """
+    Parse a market's [latitude, longitude] pair from the market data.
+    
+    Returns:
+        (latitude, longitude) in degrees, or None if the coordinates are
+        missing, non-numeric or out of range
+    """
+    try:
+        lat, lon = (float(value) for value in coords)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        return None
+    return lat, lon
+
+def _load_json(path: Path) -> Any:
+    """
+    Read and parse a JSON data file, with orjson when it is installed.
+    orjson's decode errors are json.JSONDecodeError subclasses.
+    """
+    if HAS_ORJSON:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 def load_market_data() -> Dict[str, Dict[str, Dict[str, List[float]]]]:
     """
     Load market data from the geocoded_markets.json file.
@@ -27,8 +129,7 @@ def load_market_data() -> Dict[str, Dict[str, Dict[str, List[float]]]]:
         Nested dictionary with market data organized by state, district, and market name
     """
     try:
-        with open(MARKETS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _load_json(MARKETS_FILE)
     except FileNotFoundError:
         print(f"Warning: Market data file not found at {MARKETS_FILE}")
         return {}
@@ -36,6 +137,129 @@ def load_market_data() -> Dict[str, Dict[str, Dict[str, List[float]]]]:
         print(f"Warning: Invalid JSON in market data file {MARKETS_FILE}")
         return {}
 
+@lru_cache(maxsize=1)
+def _load_market_index(mtime: float) -> _MarketIndex:
+    """
+    Flatten the market data into arrays for vectorized distance scans.
+    
+    The result is cached per file modification time. Markets are stored in
+    file order, so the markets of each district occupy one contiguous range
+    of rows.
+    
+    Args:
+        mtime: Modification time of MARKETS_FILE (cache key)
+        
+    Returns:
+        _MarketIndex over every market with valid coordinates
+    """
+    lats, lons, meta = [], [], []
+    districts = {}
+    for state_name, state_markets in load_market_data().items():
+        state_districts = districts.setdefault(state_name, {})
+        for district_name, district_markets in state_markets.items():
+            start = len(meta)
+            for market_name, coords in district_markets.items():
+                coordinates = _market_coordinates(coords)
+                if coordinates is None:
+                    continue
+                lats.append(coordinates[0])
+                lons.append(coordinates[1])
+                meta.append((state_name, district_name, market_name))
+            state_districts[district_name] = range(start, len(meta))
+    
+    lats = np.array(lats, dtype=np.float64)
+    lons = np.array(lons, dtype=np.float64)
+    # Lowercase names for matching what the reverse geocoder returns, where
+    # the first spelling wins if two differ only in case
+    state_names = {}
+    district_names = {}
+    for state_name, state_districts in districts.items():
+        state_names.setdefault(state_name.lower(), state_name)
+        lowercase = district_names[state_name] = {}
+        for district_name in state_districts:
+            lowercase.setdefault(district_name.lower(), district_name)
+    
+    lat_rad = np.radians(lats)
+    tree = cKDTree(_unit_xyz(lats, lons)) if HAS_SCIPY and meta else None
+    return _MarketIndex(
+        lats, lons, lat_rad, np.radians(lons), np.cos(lat_rad), meta,
+        districts, state_names, district_names, tree
+    )
+
+def _match_name(name: Optional[str], names: Dict[str, Any], lowercase_names: Dict[str, str]) -> Optional[str]:
+    """
+    Find the key of names matching name, ignoring case if there's no exact match.
+    
+    Returns:
+        The matching key, or None if there is none
+    """
+    if not name:
+        return None
+    if name in names:
+        return name
+    return lowercase_names.get(name.lower())
+
+def _market_index() -> Optional[_MarketIndex]:
+    """
+    Get the market index for the current market data file.
+    
+    Returns:
+        _MarketIndex, or None if the market data file doesn't exist
+    """
+    try:
+        mtime = os.stat(MARKETS_FILE).st_mtime
+    except FileNotFoundError:
+        print(f"Warning: Market data file not found at {MARKETS_FILE}")
+        return None
+    return _load_market_index(mtime)
+
+def _nearest_market_row(index: Any, rows: np.ndarray, lat: float, lon: float) -> Optional[int]:
+    """
+    Find the row of the market nearest (lat, lon) among the given rows,
+    using the KD-tree when every market is searched and one vectorized
+    haversine pass otherwise. Markets within GEODESIC_RECHECK_FACTOR of the
+    nearest are measured again with calculate_distance, so the result
+    matches it even when geopy is installed.
+    
+    Args:
+        index: _MarketIndex, or any market table with the same lats, lons,
+            lat_rad, lon_rad, cos_lat and tree fields
+        rows: Rows of the markets to search
+        lat: Latitude coordinate
+        lon: Longitude coordinate
+    
+    Returns:
+        Index into the market table, or None if rows is empty
+    """
+    if not rows.size:
+        return None
+    
+    if index.tree is not None and rows.size == len(index.lats):
+        # Searching every market: find the nearest with the tree, then every
+        # market within the recheck factor of it. Chord length on the unit
+        # sphere grows with great-circle distance, so the ball is exact.
+        query = _unit_xyz(lat, lon)
+        chord, _ = index.tree.query(query, k=1)
+        arc = 2 * math.asin(min(1.0, chord / 2)) * GEODESIC_RECHECK_FACTOR + 1e-9 / EARTH_RADIUS_KM
+        radius = 2 * math.sin(min(math.pi, arc) / 2) + 1e-12
+        candidates = sorted(index.tree.query_ball_point(query, radius))
+    else:
+        # The haversine term a grows with distance, so the recheck bound is
+        # converted to a once instead of converting every a to kilometers
+        lat_rad = math.radians(lat)
+        dlat = index.lat_rad[rows] - lat_rad
+        dlon = index.lon_rad[rows] - math.radians(lon)
+        a = np.sin(dlat / 2) ** 2 + index.cos_lat[rows] * math.cos(lat_rad) * np.sin(dlon / 2) ** 2
+        half_arc = math.asin(min(1.0, math.sqrt(a.min()))) * GEODESIC_RECHECK_FACTOR + 1e-9 / (2 * EARTH_RADIUS_KM)
+        bound = math.sin(min(math.pi / 2, half_arc)) ** 2
+        candidates = rows[a <= bound].tolist()
+    
+    # Markets can share coordinates; ties go to the first in file order
+    return min(
+        candidates,
+        key=lambda row: (calculate_distance((lat, lon), (float(index.lats[row]), float(index.lons[row]))), row)
+    )
+
 def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """
     Calculate the distance between two coordinates in kilometers.
@@ -48,34 +272,22 @@ def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float])
     Returns:
         Distance in kilometers
     """
-    # Try to use geopy if available
-    try:
-        from geopy.distance import geodesic
+    if HAS_GEOPY:
         return geodesic(coord1, coord2).kilometers
-    except ImportError:
+    else:
         # Fallback to haversine formula
         lat1, lon1 = coord1
         lat2, lon2 = coord2
         
-        # Convert latitude and longitude from degrees to radians
         lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
         lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-        
-        # Haversine formula
-        dlon = lon2_rad - lon1_rad
         dlat = lat2_rad - lat1_rad
+        dlon = math.radians(lon2 - lon1)
         a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         
-        # Earth's radius in kilometers
-        radius = 6371.0
-        
-        # Calculate the distance
-        distance = radius * c
-        
-        return distance
+        # asin needs one transcendental call fewer than atan2(sqrt(a), sqrt(1-a));
+        # min() guards against rounding pushing a just above 1
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
 
 def get_state_district(lat: float, lon: float) -> Tuple[str, Optional[str]]:
     """
@@ -88,7 +300,70 @@ def get_state_district(lat: float, lon: float) -> Tuple[str, Optional[str]]:
     Returns:
         Tuple of (state_name, district_name) where district_name may be None if not found
     """
+    # Nearby points share one cached API response; copy it so callers
+    # can't modify the cache
+    return dict(_reverse_geocode(
+        round(lat, NOMINATIM_CACHE_DECIMALS),
+        round(lon, NOMINATIM_CACHE_DECIMALS)
+    ))
+
+# Cache files whose table has already been created by this process
+_geocode_cache_ready = set()
+_geocode_cache_ready_lock = threading.Lock()
 
+def _geocode_cache_connect() -> sqlite3.Connection:
+    """Open the on-disk reverse geocoding cache, creating the table the first time."""
+    conn = sqlite3.connect(GEOCODE_CACHE_FILE, timeout=10)
+    path = str(GEOCODE_CACHE_FILE)
+    if path in _geocode_cache_ready:
+        return conn
+    with _geocode_cache_ready_lock:
+        if path not in _geocode_cache_ready:
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS locations (lat REAL, lon REAL, ts REAL, payload TEXT, PRIMARY KEY (lat, lon))"
+                )
+            except sqlite3.Error:
+                conn.close()
+                raise
+            _geocode_cache_ready.add(path)
+    return conn
+
+def _geocode_cache_get(lat: float, lon: float) -> Optional[Dict[str, Optional[str]]]:
+    """Return a fresh cached reverse geocoding result, or None."""
+    try:
+        with closing(_geocode_cache_connect()) as conn:
+            row = conn.execute(
+                "SELECT ts, payload FROM locations WHERE lat = ? AND lon = ?", (lat, lon)
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None or time.time() - row[0] > GEOCODE_CACHE_MAX_AGE:
+        return None
+    return json.loads(row[1])
+
+def _geocode_cache_put(lat: float, lon: float, result: Dict[str, Optional[str]]) -> None:
+    """Store a reverse geocoding result on disk, ignoring cache errors."""
+    try:
+        with closing(_geocode_cache_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO locations (lat, lon, ts, payload) VALUES (?, ?, ?, ?)",
+                (lat, lon, time.time(), json.dumps(result))
+            )
+    except sqlite3.Error:
+        pass
+
+@lru_cache(maxsize=4096)
+def _reverse_geocode(lat: float, lon: float) -> Dict[str, Optional[str]]:
+    """
+    Look up the state, county and district of a point, from the on-disk
+    cache or the Nominatim API. Failures raise, so only successful lookups
+    are cached.
+    """
+    cached = _geocode_cache_get(lat, lon)
+    if cached is not None:
+        return cached
+    
     # Hit the location API
     params = {
         "lat": lat,
@@ -99,28 +374,21 @@ def get_state_district(lat: float, lon: float) -> Tuple[str, Optional[str]]:
         "accept-language": "en"
     }
 
-    headers = {
-        "User-Agent": "Farmora/1.0 (farmora.app; contact@farmora.app)"
-    }
-
-    try:
-        response = requests.get(NOMINATIM_API, params=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+    response = _nominatim_session.get(NOMINATIM_API, params=params, timeout=NOMINATIM_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    
+    if "address" not in data:
+        raise RuntimeError("No address information found in the API response")
         
-        if "address" not in data:
-            raise RuntimeError("No address information found in the API response")
-            
-        address = data.get("address", {})
+    address = data.get("address", {})
 
-        if not address:
-            return {}
+    if not address:
+        return {}
 
-        result = {"State" : address.get('state'), "County": address.get('county'), "District": address.get('state_district')}
-        
-        return result
-    except Exception as e:
-        raise e
+    result = {"State" : address.get('state'), "County": address.get('county'), "District": address.get('state_district')}
+    _geocode_cache_put(lat, lon, result)
+    return result
 
 def get_nearest_market(lat: float, lon: float, debug: bool = False) -> Dict[str, Any]:
     """
@@ -145,104 +413,69 @@ def get_nearest_market(lat: float, lon: float, debug: bool = False) -> Dict[str,
             print(f"Location info: State={state}, District={district}, County={county}")
         
         # Load market data
-        markets_data = load_market_data()
-        if not markets_data:
+        index = _market_index()
+        if index is None or not index.districts:
             print("No market data found")
             return {}
         
-        # Create a list to store all potential markets with their distances
-        all_markets = []
-        
         # If we have state info, try to search within that state first
-        if state and state in markets_data:
-            search_states = [state]
+        state_match = _match_name(state, index.districts, index.state_names)
+        if state_match:
+            search_states = [state_match]
             if debug:
-                print(f"Searching in state: {state}")
+                print(f"Searching in state: {state_match}")
         else:
             # Otherwise search all states
-            search_states = markets_data.keys()
+            search_states = index.districts.keys()
             if debug:
                 print(f"State not found in market data. Searching in all {len(search_states)} states")
         
-        # Search through all relevant states
+        # Collect the rows of every market in the relevant states and districts
+        search_rows = []
         for state_name in search_states:
-            state_markets = markets_data.get(state_name, {})
+            state_districts = index.districts[state_name]
+            district_names = index.district_names[state_name]
+            district_match = _match_name(district, state_districts, district_names)
+            county_match = _match_name(county, state_districts, district_names)
             
             # If we have district info and it exists in the state data, search there first
-            if district and district in state_markets:
-                search_districts = [district]
+            if district_match:
+                search_districts = [district_match]
                 if debug:
-                    print(f"  Searching in district: {district} within {state_name}")
-            elif county and county in state_markets:
-                search_districts = [county]
+                    print(f"  Searching in district: {district_match} within {state_name}")
+            elif county_match:
+                search_districts = [county_match]
                 if debug:
-                    print(f"  Searching in county: {county} within {state_name}")
+                    print(f"  Searching in county: {county_match} within {state_name}")
             else:
                 # Otherwise search all districts in this state
-                search_districts = state_markets.keys()
+                search_districts = state_districts.keys()
                 if debug:
                     print(f"  District/County not found in {state_name}. Searching in all {len(search_districts)} districts")
             
-            # Search through relevant districts
             for district_name in search_districts:
-                district_markets = state_markets.get(district_name, {})
-                
+                rows = state_districts[district_name]
                 if debug:
-                    print(f"    Checking {len(district_markets)} markets in {district_name}")
-                
-                # Search through each market in this district
-                for market_name, coords in district_markets.items():
-                    # Skip markets with invalid or empty coordinates
-                    if not coords or len(coords) < 2:
-                        continue
-                    
-                    # Some entries might have only one coordinate or might be empty arrays
-                    try:
-                        # Make sure coordinates are valid numbers
-                        if coords[0] is None or coords[1] is None:
-                            continue
-                            
-                        market_lat = float(coords[0])
-                        market_lon = float(coords[1])
-                        
-                        # Check if the coordinates make sense (basic validation)
-                        if not (-90 <= market_lat <= 90) or not (-180 <= market_lon <= 180):
-                            continue
-                        
-                        # Calculate distance
-                        market_coords = (market_lat, market_lon)
-                        user_coords = (lat, lon)
-                        distance = calculate_distance(user_coords, market_coords)
-                        
-                        # Store market info
-                        all_markets.append({
-                            "market_name": market_name,
-                            "state": state_name,
-                            "district": district_name,
-                            "latitude": market_lat,
-                            "longitude": market_lon,
-                            "distance_km": distance
-                        })
-                        
-                    except (IndexError, TypeError, ValueError):
-                        continue
-        
-        # Sort all markets by distance to get the truly nearest one
-        all_markets.sort(key=lambda x: x["distance_km"])
+                    print(f"    Checking {len(rows)} markets in {district_name}")
+                search_rows.append(np.arange(rows.start, rows.stop))
         
-        # Return results using the first market from the sorted list
-        if all_markets:
-            nearest = all_markets[0]
-            return {
-                "market_name": nearest["market_name"],
-                "state": nearest["state"],
-                "district": nearest["district"],
-                "latitude": nearest["latitude"],
-                "longitude": nearest["longitude"],
-                "distance_km": round(nearest["distance_km"], 2)
-            }
-        else:
+        # Compute every distance in one pass to get the truly nearest market
+        rows = np.concatenate(search_rows) if search_rows else np.empty(0, dtype=np.intp)
+        nearest = _nearest_market_row(index, rows, lat, lon)
+        if nearest is None:
             return {}
+        
+        state_name, district_name, market_name = index.meta[nearest]
+        market_lat = float(index.lats[nearest])
+        market_lon = float(index.lons[nearest])
+        return {
+            "market_name": market_name,
+            "state": state_name,
+            "district": district_name,
+            "latitude": market_lat,
+            "longitude": market_lon,
+            "distance_km": round(calculate_distance((lat, lon), (market_lat, market_lon)), 2)
+        }
             
     except Exception as e:
         print(f"Error finding nearest market: {e}")
@@ -9,9 +9,10 @@ access and enable geographic proximity calculations.
 import time
 import json
 import os
-import math
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional, Any
+from typing import Dict, List, Set, Tuple, Optional, Any, NamedTuple
+import numpy as np
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -21,13 +22,20 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import requests
 
-# Try to import geopy for distance calculation, but provide fallback if not available
+from .geo_utils import _market_coordinates, _nearest_market_row, _unit_xyz, calculate_distance
+
 try:
-    from geopy.distance import geodesic
-    HAS_GEOPY = True
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
 except ImportError:
-    HAS_GEOPY = False
-    
+    HAS_SCIPY = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 try:
     import pandas as pd
     HAS_PANDAS = True
@@ -43,37 +51,12 @@ GEOCODED_MARKETS_FILE = DATA_DIR / "geocoded_markets.json"
 # Ensure the data directory exists
 DATA_DIR.mkdir(exist_ok=True)
 
-def calculate_distance(coord1, coord2):
-    """
-    Calculate the distance between two coordinates in kilometers.
-    Uses geopy if available, otherwise falls back to haversine formula.
-    """
-    if HAS_GEOPY:
-        return geodesic(coord1, coord2).kilometers
-    else:
-        # Fallback to haversine formula
-        lat1, lon1 = coord1
-        lat2, lon2 = coord2
-        
-        # Convert latitude and longitude from degrees to radians
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-        
-        # Haversine formula
-        dlon = lon2_rad - lon1_rad
-        dlat = lat2_rad - lat1_rad
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        # Earth's radius in kilometers
-        radius = 6371.0
-        
-        # Calculate the distance
-        distance = radius * c
-        
-        return distance
+def _load_json(path):
+    """Read and parse a JSON data file, with orjson when it is installed."""
+    if HAS_ORJSON:
+        return orjson.loads(Path(path).read_bytes())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def setup_driver():
     """Set up and return a Chrome WebDriver with appropriate options."""
@@ -199,8 +182,7 @@ def scrape_all_market_data():
 def load_market_data():
     """Load market data from file if it exists, otherwise scrape it."""
     if os.path.exists(MARKETS_FILE):
-        with open(MARKETS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _load_json(MARKETS_FILE)
     else:
         return scrape_all_market_data()
 
@@ -221,6 +203,9 @@ def geocode_markets(market_data):
     # Track markets that couldn't be geocoded
     failed_geocodes = []
     
+    # Reuse one keep-alive connection for the thousands of requests below
+    session = requests.Session()
+    
     for state_name, state_data in market_data["states"].items():
         geocoded_markets[state_name] = {}
         
@@ -246,7 +231,7 @@ def geocode_markets(market_data):
                 
                 try:
                     # Make the API request
-                    response = requests.get(geocode_url, params=params, headers=headers)
+                    response = session.get(geocode_url, params=params, headers=headers, timeout=(5, 15))
                     response.raise_for_status()
                     results = response.json()
                     
@@ -263,7 +248,7 @@ def geocode_markets(market_data):
                         search_query = f"{market_name}, {state_name}, India"
                         params["q"] = search_query
                         
-                        response = requests.get(geocode_url, params=params, headers=headers)
+                        response = session.get(geocode_url, params=params, headers=headers, timeout=(5, 15))
                         response.raise_for_status()
                         results = response.json()
                         
@@ -293,6 +278,8 @@ def geocode_markets(market_data):
                         "error": str(e)
                     })
     
+    session.close()
+    
     # Print summary of geocoding results
     total_markets = sum(
         len(markets) 
@@ -317,6 +304,64 @@ def geocode_markets(market_data):
         
     return geocoded_markets
 
+@lru_cache(maxsize=1)
+def _load_geocoded_markets(mtime):
+    """
+    Load the geocoded markets file. The result is cached per file
+    modification time, so the JSON is only parsed again when it changes.
+    """
+    return _load_json(GEOCODED_MARKETS_FILE)
+
+class _MarketArrays(NamedTuple):
+    """Geocoded markets flattened into parallel arrays, one row per market."""
+    states: np.ndarray
+    districts: np.ndarray
+    markets: List[str]
+    lats: np.ndarray  # degrees
+    lons: np.ndarray  # degrees
+    lat_rad: np.ndarray
+    lon_rad: np.ndarray
+    cos_lat: np.ndarray
+    tree: Optional["cKDTree"]  # over unit-sphere coordinates, None without scipy
+    # (state, district) filter in lowercase, either part None when not
+    # filtered on -> rows of the matching markets
+    filters: Dict[Tuple[Optional[str], Optional[str]], np.ndarray]
+
+def _market_arrays(geocoded_markets):
+    """
+    Flatten geocoded market data into _MarketArrays, skipping markets
+    without valid coordinates.
+    """
+    rows = []
+    for state_name, districts in geocoded_markets.items():
+        for district_name, markets in districts.items():
+            for market_name, coords in markets.items():
+                coordinates = _market_coordinates(coords)
+                if coordinates is not None:
+                    rows.append((state_name, district_name, market_name) + coordinates)
+    states, districts, markets, lats, lons = zip(*rows) if rows else ((),) * 5
+    lats = np.array(lats, dtype=np.float64)
+    lons = np.array(lons, dtype=np.float64)
+    lat_rad = np.radians(lats)
+    tree = cKDTree(_unit_xyz(lats, lons)) if HAS_SCIPY and len(lats) else None
+    
+    filters = {}
+    for row, (state_name, district_name) in enumerate(zip(states, districts)):
+        state_key, district_key = state_name.lower(), district_name.lower()
+        for key in ((state_key, district_key), (state_key, None), (None, district_key)):
+            filters.setdefault(key, []).append(row)
+    filters = {key: np.array(key_rows, dtype=np.intp) for key, key_rows in filters.items()}
+    
+    return _MarketArrays(
+        np.array(states, dtype=str), np.array(districts, dtype=str), list(markets),
+        lats, lons, lat_rad, np.radians(lons), np.cos(lat_rad), tree, filters
+    )
+
+@lru_cache(maxsize=1)
+def _geocoded_market_arrays(mtime):
+    """_market_arrays of the geocoded markets file, cached per modification time."""
+    return _market_arrays(_load_geocoded_markets(mtime))
+
 def find_nearest_market(lat, lon, state=None, district=None):
     """
     Find the nearest market to the given coordinates.
@@ -324,43 +369,41 @@ def find_nearest_market(lat, lon, state=None, district=None):
     """
     # Load geocoded market data
     if os.path.exists(GEOCODED_MARKETS_FILE):
-        with open(GEOCODED_MARKETS_FILE, 'r', encoding='utf-8') as f:
-            geocoded_markets = json.load(f)
+        mtime = os.stat(GEOCODED_MARKETS_FILE).st_mtime
+        geocoded_markets = _load_geocoded_markets(mtime)
+        arrays = _geocoded_market_arrays(mtime)
     else:
         market_data = load_market_data()
         geocoded_markets = geocode_markets(market_data)
+        arrays = _market_arrays(geocoded_markets)
+    
+    # Rows of the markets in the requested state and district, ignoring case
+    if state or district:
+        key = (state.lower() if state else None, district.lower() if district else None)
+        rows = arrays.filters.get(key, np.empty(0, dtype=np.intp))
+    else:
+        rows = np.arange(len(arrays.markets))
     
     nearest_market = None
     nearest_distance = float('inf')
     nearest_state = None
     nearest_district = None
     
-    for state_name, districts in geocoded_markets.items():
-        # Skip if a specific state is requested and this isn't it
-        if state and state != state_name:
-            continue
-            
-        for district_name, markets in districts.items():
-            # Skip if a specific district is requested and this isn't it
-            if district and district != district_name:
-                continue
-                
-            for market_name, coords in markets.items():
-                market_lat, market_lon = coords
-                distance = calculate_distance((lat, lon), (market_lat, market_lon))
-                
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_market = market_name
-                    nearest_state = state_name
-                    nearest_district = district_name
+    row = _nearest_market_row(arrays, rows, lat, lon)
+    if row is not None:
+        nearest_market = arrays.markets[row]
+        nearest_state = str(arrays.states[row])
+        nearest_district = str(arrays.districts[row])
+        nearest_distance = calculate_distance((lat, lon), (float(arrays.lats[row]), float(arrays.lons[row])))
     
+    # Copy the coordinates so callers can't modify the cached data
+    coordinates = geocoded_markets.get(nearest_state, {}).get(nearest_district, {}).get(nearest_market)
     return {
         "market": nearest_market,
         "district": nearest_district,
         "state": nearest_state,
         "distance_km": nearest_distance,
-        "coordinates": geocoded_markets.get(nearest_state, {}).get(nearest_district, {}).get(nearest_market)
+        "coordinates": list(coordinates) if coordinates is not None else None
     }
 
 if __name__ == "__main__":